@@ -0,0 +1,215 @@
+"""
+Облегчённые версии страниц по доменам: AMP (rel="amphtml") и версия для печати, из которых статья извлекается не хуже
+"""
+
+import os
+import time
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+from search_cache import CACHE_DIR
+from html_head import extract_head_meta, head_section
+
+
+ALTERNATE_AMP = "amp"
+ALTERNATE_PRINT = "print"
+
+# Маркер места пути статьи в шаблоне URL облегчённой версии
+PATH_PLACEHOLDER = "{path}"
+
+
+def find_alternates(html: str, url: str) -> List[Tuple[str, str]]:
+    """Облегчённые версии, объявленные в <head> страницы: [(вид, абсолютный URL)], AMP первой"""
+    head = extract_head_meta(head_section(html))
+    alternates = []
+    for kind, href in ((ALTERNATE_AMP, head.amp_url), (ALTERNATE_PRINT, head.print_url)):
+        if href:
+            alternates.append((kind, urljoin(url, href)))
+    return alternates
+
+
+def canonical_of(html: str, url: str) -> Optional[str]:
+    """Абсолютный <link rel="canonical"> страницы или None"""
+    canonical = extract_head_meta(head_section(html)).canonical_url
+    return urljoin(url, canonical) if canonical else None
+
+
+def _host(parsed) -> str:
+    """Хост адреса без www."""
+    host = parsed.netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def same_page(url: str, other: str) -> bool:
+    """Один и тот же адрес с точностью до схемы, www. и завершающего слеша"""
+    def normalize(value: str) -> Tuple[str, str, str]:
+        parsed = urlparse(value)
+        return _host(parsed), parsed.path.rstrip("/"), parsed.query
+    return normalize(url) == normalize(other)
+
+
+def _article_path(url: str) -> Optional[str]:
+    """Путь статьи для подстановки в шаблон (адреса с query и главная страница не подходят)"""
+    parsed = urlparse(url)
+    path = parsed.path.rstrip("/")
+    if parsed.query or len(path) < 2:
+        return None
+    return path
+
+
+def alternate_pattern(url: str, alternate_url: str) -> Optional[str]:
+    """
+    Шаблон URL облегчённой версии: alternate_url, где путь статьи в пути версии заменён на {path}
+
+    Схема и хост версии остаются как есть, и хост должен совпадать с хостом статьи: шаблон никогда не уводит
+    загрузку на другой сайт. None — путь статьи не найден или шаблон не воспроизводит alternate_url.
+    """
+    path = _article_path(url)
+    parsed = urlparse(alternate_url)
+    if path is None or PATH_PLACEHOLDER in alternate_url or _host(parsed) != _host(urlparse(url)):
+        return None
+
+    # Путь статьи обычно в конце пути версии (/amp/news/1, /news/1/print) — ищем последнее вхождение по границе сегмента
+    position = parsed.path.rfind(path)
+    end = position + len(path)
+    if position == -1 or parsed.path[end:end + 1] not in ("", "/", "."):
+        return None
+
+    # Путь идёт сразу после scheme://netloc; остальное (query и т.п.) переносится в шаблон как есть
+    path_start = len(f"{parsed.scheme}://{parsed.netloc}")
+    pattern = alternate_url[:path_start + position] + PATH_PLACEHOLDER + alternate_url[path_start + end:]
+    return pattern if alternate_url_for(pattern, url) == alternate_url else None
+
+
+def alternate_url_for(pattern: str, url: str) -> Optional[str]:
+    """URL облегчённой версии статьи по шаблону домена (None — адрес статьи не подходит под шаблон)"""
+    path = _article_path(url)
+    if path is None:
+        return None
+    alternate_url = pattern.replace(PATH_PLACEHOLDER, path, 1)
+    # Шаблон, сохранённый до проверки хоста, мог подставлять путь в хост — такой адрес не загружаем
+    return alternate_url if _host(urlparse(alternate_url)) == _host(urlparse(url)) else None
+
+
+class AlternateStore:
+    def __init__(self, db_path: str = None, recheck_after: float = 7 * 24 * 60 * 60, max_failures: int = 3):
+        """
+        Инициализация хранилища
+
+        Args:
+            db_path: Путь к SQLite базе (общая для всех воркеров на узле, переживает перезапуск)
+            recheck_after: Через сколько секунд снова искать облегчённую версию у домена, где её не нашли
+            max_failures: После скольких откатов подряд на основную страницу шаблон домена забывается
+        """
+        self.db_path = db_path or os.path.join(CACHE_DIR, "domain_alternates.sqlite3")
+        self.recheck_after = recheck_after
+        self.max_failures = max_failures
+
+        self._lock = threading.Lock()
+        # Домены, которые сейчас проверяются (чтобы статьи одного сайта в пачке не проверяли его одновременно)
+        self._probing = set()
+        self.stats = {"hits": 0, "fallbacks": 0, "probes": 0, "learned": 0}
+
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._connection = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS alternates "
+            "(domain TEXT PRIMARY KEY, kind TEXT, pattern TEXT, hits INTEGER NOT NULL DEFAULT 0, "
+            "fallbacks INTEGER NOT NULL DEFAULT 0, failures INTEGER NOT NULL DEFAULT 0, checked_at REAL NOT NULL)"
+        )
+        self._connection.commit()
+
+    def get(self, domain: str) -> Optional[Dict]:
+        """Облегчённая версия домена: {"kind": ..., "pattern": ...} или None (нет или ещё не проверяли)"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT kind, pattern FROM alternates WHERE domain = ? AND pattern IS NOT NULL", (domain,)
+            ).fetchone()
+        return {"kind": row[0], "pattern": row[1]} if row else None
+
+    def begin_probe(self, domain: str) -> bool:
+        """Занять проверку домена (False — проверен недавно или уже проверяется)"""
+        with self._lock:
+            if domain in self._probing:
+                return False
+            row = self._connection.execute(
+                "SELECT pattern, checked_at FROM alternates WHERE domain = ?", (domain,)
+            ).fetchone()
+            if row and (row[0] is not None or row[1] > time.time() - self.recheck_after):
+                return False
+            self._probing.add(domain)
+            self.stats["probes"] += 1
+            return True
+
+    def cancel_probe(self, domain: str) -> None:
+        """Снять занятость проверки без итога (проверка прервана остановкой приложения)"""
+        with self._lock:
+            self._probing.discard(domain)
+
+    def learn(self, domain: str, kind: Optional[str], pattern: Optional[str]) -> None:
+        """Записать итог проверки домена (pattern None — подходящей облегчённой версии нет)"""
+        with self._lock:
+            self._probing.discard(domain)
+            self._connection.execute(
+                "INSERT INTO alternates (domain, kind, pattern, checked_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(domain) DO UPDATE SET kind = excluded.kind, pattern = excluded.pattern, "
+                "failures = 0, checked_at = excluded.checked_at",
+                (domain, kind, pattern, time.time())
+            )
+            if pattern:
+                self.stats["learned"] += 1
+            self._connection.commit()
+
+    def record(self, domain: str, used: bool) -> None:
+        """
+        Учесть загрузку статьи домена через облегчённую версию
+
+        Args:
+            domain: Домен статьи
+            used: Статья взята из облегчённой версии (False — откат на основную страницу)
+        """
+        with self._lock:
+            if used:
+                self.stats["hits"] += 1
+                self._connection.execute(
+                    "UPDATE alternates SET hits = hits + 1, failures = 0 WHERE domain = ?", (domain,)
+                )
+            else:
+                self.stats["fallbacks"] += 1
+                self._connection.execute(
+                    "UPDATE alternates SET fallbacks = fallbacks + 1, failures = failures + 1 WHERE domain = ?",
+                    (domain,)
+                )
+                # Версия перестала подходить (сменилась вёрстка или адреса) — забываем до следующей проверки
+                self._connection.execute(
+                    "UPDATE alternates SET pattern = NULL, checked_at = ? WHERE domain = ? AND failures >= ?",
+                    (time.time(), domain, self.max_failures)
+                )
+            self._connection.commit()
+
+    def get_stats(self) -> Dict:
+        """Счётчики текущего процесса и накопленные данные по всем доменам"""
+        with self._lock:
+            domains, hits, fallbacks = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(hits), 0), COALESCE(SUM(fallbacks), 0) "
+                "FROM alternates WHERE pattern IS NOT NULL"
+            ).fetchone()
+            return {
+                **self.stats,
+                "domains": domains,
+                "total_hits": hits,
+                "total_fallbacks": fallbacks
+            }
+
+
+_alternate_store = None
+
+
+def get_alternate_store() -> AlternateStore:
+    """Общий для процесса экземпляр хранилища облегчённых версий"""
+    global _alternate_store
+    if _alternate_store is None:
+        _alternate_store = AlternateStore()
+    return _alternate_store
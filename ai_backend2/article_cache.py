@@ -0,0 +1,109 @@
+"""
+Контентно-адресуемый кеш этапов обработки статей: извлечение → очистка → чанки
+"""
+
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Optional, Any
+from search_cache import CACHE_DIR
+
+
+# Этапы обработки, результаты которых кешируются отдельно
+EXTRACTION = "extraction"  # ключ: хеш HTML
+CLEANING = "cleaning"      # ключ: хеш извлечённого текста + настройки очистки
+CHUNKING = "chunking"      # ключ: хеш очищенного текста + размер чанка и метод
+
+
+class ArticleCache:
+    def __init__(self, db_path: str = None, ttl: float = 7 * 24 * 60 * 60):
+        """
+        Инициализация кеша
+
+        Args:
+            db_path: Путь к SQLite базе (общая для всех воркеров на узле)
+            ttl: Время жизни записей в секундах
+        """
+        self.db_path = db_path or os.path.join(CACHE_DIR, "article_cache.sqlite3")
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.stats = {kind: {"hits": 0, "misses": 0} for kind in (EXTRACTION, CLEANING, CHUNKING)}
+
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._connection = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS stages "
+            "(kind TEXT NOT NULL, key TEXT NOT NULL, payload BLOB NOT NULL, expires_at REAL NOT NULL, "
+            "PRIMARY KEY (kind, key))"
+        )
+        self._connection.commit()
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Ключ по содержимому: SHA-256 от текста/байтов и настроек этапа"""
+        digest = hashlib.sha256()
+        for part in parts:
+            if isinstance(part, bytes):
+                digest.update(part)
+            elif isinstance(part, str):
+                digest.update(part.encode("utf-8"))
+            else:
+                digest.update(json.dumps(part, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def get(self, kind: str, key: str) -> Optional[Dict]:
+        """Результат этапа или None"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT payload FROM stages WHERE kind = ? AND key = ? AND expires_at > ?",
+                (kind, key, time.time())
+            ).fetchone()
+
+        if row is None:
+            return None
+        return json.loads(zlib.decompress(row[0]))
+
+    def set(self, kind: str, key: str, payload: Dict) -> None:
+        """Сохранить результат этапа в сжатом виде"""
+        compressed = zlib.compress(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+        now = time.time()
+
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO stages (kind, key, payload, expires_at) VALUES (?, ?, ?, ?)",
+                (kind, key, compressed, now + self.ttl)
+            )
+            self._writes += 1
+            if self._writes % 100 == 0:
+                self._connection.execute("DELETE FROM stages WHERE expires_at <= ?", (now,))
+            self._connection.commit()
+
+    def record_hits(self, cache_hits: Dict[str, bool]) -> None:
+        """Учесть попадания по этапам (обработка может идти в другом процессе, поэтому счёт ведёт вызывающий)"""
+        with self._lock:
+            for kind, hit in cache_hits.items():
+                self.stats[kind]["hits" if hit else "misses"] += 1
+
+    def get_stats(self) -> Dict:
+        """Попадания и промахи по этапам в текущем процессе"""
+        with self._lock:
+            return {kind: dict(counters) for kind, counters in self.stats.items()}
+
+
+_article_cache = None
+
+
+def get_article_cache() -> ArticleCache:
+    """Общий для процесса экземпляр кеша (TTL настраивается через ARTICLE_CACHE_TTL)"""
+    global _article_cache
+    if _article_cache is None:
+        _article_cache = ArticleCache(ttl=float(os.getenv("ARTICLE_CACHE_TTL", 7 * 24 * 60 * 60)))
+    return _article_cache
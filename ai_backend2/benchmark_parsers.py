@@ -0,0 +1,201 @@
+"""
+Сравнение бэкендов разбора HTML на корпусе сохранённых страниц: время, память и расхождения текста
+
+Запуск:
+    python benchmark_parsers.py corpus/                      # корпус — каталог с *.html
+    python benchmark_parsers.py corpus/ --fetch urls.txt     # сначала скачать страницы по списку URL
+    python benchmark_parsers.py corpus/ --repeat 5 --show-diff 3
+"""
+
+import os
+import re
+import sys
+import time
+import hashlib
+import argparse
+import difflib
+import statistics
+import multiprocessing
+from typing import Dict, List
+
+try:
+    import resource
+except ImportError:
+    resource = None  # Windows — пиковую память не измеряем
+
+from html_head import detect_charset, decode_html
+from parser_backends import available_backends, get_parser_backend
+
+
+# Поля результата, которые сравниваются между бэкендами
+COMPARED_FIELDS = ("title", "meta_description", "content")
+
+
+def fetch_corpus(urls_file: str, corpus_dir: str) -> None:
+    """Скачать страницы из списка URL (по одному на строку) в каталог корпуса"""
+    import httpx
+    from fetch_engine import DEFAULT_FETCH_HEADERS
+
+    os.makedirs(corpus_dir, exist_ok=True)
+    with open(urls_file, 'r', encoding='utf-8') as f:
+        urls = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+    with httpx.Client(headers=DEFAULT_FETCH_HEADERS, timeout=20, follow_redirects=True) as client:
+        for url in urls:
+            path = os.path.join(corpus_dir, hashlib.sha1(url.encode('utf-8')).hexdigest()[:16] + ".html")
+            if os.path.exists(path):
+                continue
+            try:
+                response = client.get(url)
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                print(f"❌ {url}: {str(e)}")
+                continue
+            with open(path, 'wb') as f:
+                f.write(response.content)
+            print(f"📥 {url} → {os.path.basename(path)}")
+
+
+def load_corpus(corpus_dir: str) -> Dict[str, str]:
+    """Все *.html каталога: имя файла → текст (декодируется, как в FetchEngine, по <meta charset>)"""
+    pages = {}
+    for name in sorted(os.listdir(corpus_dir)):
+        if name.endswith(('.html', '.htm')):
+            with open(os.path.join(corpus_dir, name), 'rb') as f:
+                body = f.read()
+            pages[name] = decode_html(body, detect_charset(None, body))
+    return pages
+
+
+def _max_rss_kb() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else 0
+
+
+def run_backend(name: str, corpus_dir: str, repeat: int) -> Dict:
+    """Прогон одного бэкенда (в отдельном процессе, чтобы пиковая память не смешивалась)"""
+    backend = get_parser_backend(name)
+    pages = load_corpus(corpus_dir)
+    baseline_rss = _max_rss_kb()
+
+    timings = {}
+    outputs = {}
+    for page_name, html in pages.items():
+        page_timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            extracted = backend.extract(html, page_name)
+            page_timings.append(time.perf_counter() - started)
+        timings[page_name] = min(page_timings)
+        outputs[page_name] = extracted
+
+    return {
+        "timings": timings,
+        "outputs": outputs,
+        "peak_rss_delta_mb": (_max_rss_kb() - baseline_rss) / 1024 if resource else None
+    }
+
+
+def similarity(reference: str, text: str) -> float:
+    """Доля совпадающих слов (1.0 — тексты идентичны)"""
+    if reference == text:
+        return 1.0
+    return difflib.SequenceMatcher(None, reference.split(), text.split(), autojunk=False).ratio()
+
+
+def _sentences(text: str) -> List[str]:
+    """Текст по предложениям (извлечённый контент уже склеен в одну строку)"""
+    return re.split(r'(?<=[.!?])\s+', text)
+
+
+def _same_output(expected: Dict, actual: Dict) -> bool:
+    """Совпадение извлечённых полей (путь шаблона у бэкендов может отличаться из-за построения дерева)"""
+    return all(expected[field] == actual[field] for field in COMPARED_FIELDS)
+
+
+def print_report(results: Dict[str, Dict], reference: str, show_diff: int) -> None:
+    header = f"{'бэкенд':<12} {'всего, мс':>10} {'медиана, мс':>12} {'p95, мс':>9} {'пик RSS, МБ':>12} {'совпало':>9} {'сходство':>9}"
+    print("\n" + header)
+    print("-" * len(header))
+
+    reference_outputs = results[reference]["outputs"]
+    for name, result in results.items():
+        timings = sorted(result["timings"].values())
+        total_ms = sum(timings) * 1000
+        median_ms = statistics.median(timings) * 1000 if timings else 0
+        p95_ms = timings[int(len(timings) * 0.95) - 1] * 1000 if timings else 0
+
+        scores = [
+            similarity(reference_outputs[page]["content"], output["content"])
+            for page, output in result["outputs"].items()
+        ]
+        identical = sum(
+            1 for page, output in result["outputs"].items() if _same_output(output, reference_outputs[page])
+        )
+        memory = f"{result['peak_rss_delta_mb']:.1f}" if result["peak_rss_delta_mb"] is not None else "n/a"
+        mean_score = statistics.mean(scores) if scores else 1.0
+
+        print(f"{name:<12} {total_ms:>10.1f} {median_ms:>12.2f} {p95_ms:>9.2f} {memory:>12} "
+              f"{identical:>4}/{len(scores):<4} {mean_score:>9.3f}")
+
+    # Расхождения с эталонным бэкендом по страницам
+    for name, result in results.items():
+        if name == reference:
+            continue
+        differing = [
+            (similarity(reference_outputs[page]["content"], output["content"]), page)
+            for page, output in result["outputs"].items() if not _same_output(output, reference_outputs[page])
+        ]
+        if not differing:
+            continue
+
+        print(f"\n⚠️ {name}: отличается от {reference} на {len(differing)} страницах")
+        for score, page in sorted(differing)[:show_diff]:
+            expected, actual = reference_outputs[page], result["outputs"][page]
+            print(f"\n📄 {page} (сходство {score:.3f})")
+            for field in ("title", "meta_description"):
+                if expected[field] != actual[field]:
+                    print(f"  {field}: {expected[field]!r} → {actual[field]!r}")
+            diff = difflib.unified_diff(
+                _sentences(expected["content"]), _sentences(actual["content"]),
+                fromfile=reference, tofile=name, lineterm="", n=0
+            )
+            for line in list(diff)[:40]:
+                print(f"  {line[:200]}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Сравнение бэкендов разбора HTML")
+    parser.add_argument("corpus_dir", help="Каталог с сохранёнными страницами (*.html)")
+    parser.add_argument("--fetch", metavar="URLS_FILE", help="Сначала скачать страницы из списка URL")
+    parser.add_argument("--backends", default=",".join(available_backends()),
+                        help="Бэкенды через запятую (по умолчанию — все доступные)")
+    parser.add_argument("--reference", default="html.parser", help="Эталон для сравнения текста")
+    parser.add_argument("--repeat", type=int, default=3, help="Прогонов на страницу (берётся лучший)")
+    parser.add_argument("--show-diff", type=int, default=0, help="Сколько отличающихся страниц показать")
+    args = parser.parse_args()
+
+    if args.fetch:
+        fetch_corpus(args.fetch, args.corpus_dir)
+
+    pages = load_corpus(args.corpus_dir)
+    if not pages:
+        sys.exit(f"❌ В каталоге {args.corpus_dir} нет *.html страниц")
+
+    backends = [name.strip() for name in args.backends.split(",") if name.strip()]
+    if args.reference not in backends:
+        backends.insert(0, args.reference)
+
+    print(f"📚 Корпус: {len(pages)} страниц, {sum(map(len, pages.values())) / 1024 / 1024:.1f} млн символов")
+
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    for name in backends:
+        print(f"⏱️ {name}...")
+        with context.Pool(1) as pool:
+            results[name] = pool.apply(run_backend, (name, args.corpus_dir, args.repeat))
+
+    print_report(results, args.reference, args.show_diff)
+
+
+if __name__ == "__main__":
+    main()
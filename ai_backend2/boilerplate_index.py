@@ -0,0 +1,178 @@
+"""
+Индекс шаблонного текста по доменам: фрагменты, повторяющиеся на многих страницах одного сайта
+"""
+
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, List, Set
+from urllib.parse import urlparse, parse_qsl, urlencode
+from search_cache import CACHE_DIR
+
+
+# Фрагмент — строка или предложение; короче этого не индексируем (обычные короткие фразы повторяются везде)
+MIN_SEGMENT_LENGTH = 20
+
+# Разделители фрагментов сохраняются, чтобы после удаления шаблонных текст склеивался как был
+_SEGMENT_SPLIT_RE = re.compile(r'(\n+|(?<=[.!?…])\s+)')
+
+# Параметры ссылок из рассылок и рекламы — на содержимое страницы не влияют
+_TRACKING_PARAM_RE = re.compile(r'^(utm_\w+|fbclid|gclid|yclid|ysclid|_openstat)$', re.I)
+
+
+def split_segments(text: str) -> List[str]:
+    """Текст по фрагментам вперемешку с разделителями: [фрагмент, разделитель, фрагмент, ...]"""
+    return _SEGMENT_SPLIT_RE.split(text)
+
+
+def segment_hash(segment: str) -> int:
+    """64-битный хеш нормализованного фрагмента (0 — фрагмент слишком короткий)"""
+    normalized = ' '.join(segment.lower().split())
+    if len(normalized) < MIN_SEGMENT_LENGTH:
+        return 0
+    digest = hashlib.blake2b(normalized.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True) or 1
+
+
+def normalize_page_url(url: str) -> str:
+    """URL без схемы, www., #фрагмента, завершающего слеша и меток трекинга — одна страница, как бы на неё ни пришли"""
+    parsed = urlparse(url)
+    host = parsed.netloc.lower()
+    host = host[4:] if host.startswith("www.") else host
+    query = urlencode([(key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+                       if not _TRACKING_PARAM_RE.match(key)])
+    return host + (parsed.path.rstrip("/") or "/") + (f"?{query}" if query else "")
+
+
+def page_segment_hashes(text: str) -> List[int]:
+    """Хеши всех фрагментов страницы без повторов (для пополнения индекса)"""
+    hashes = {segment_hash(segment) for segment in split_segments(text)[::2]}
+    hashes.discard(0)
+    return sorted(hashes)
+
+
+def _text_digest(hashes: List[int]) -> int:
+    """Отпечаток текста страницы по набору его фрагментов (одинаковый текст — один отпечаток)"""
+    digest = hashlib.blake2b(b''.join(h.to_bytes(8, 'big', signed=True) for h in hashes), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+class BoilerplateIndex:
+    def __init__(self, db_path: str = None, min_pages: int = 4, ttl: float = 30 * 24 * 60 * 60):
+        """
+        Инициализация индекса
+
+        Args:
+            db_path: Путь к SQLite базе (общая для всех воркеров на узле)
+            min_pages: На скольких разных страницах домена должен встретиться фрагмент, чтобы считаться шаблонным
+            ttl: Через сколько секунд забываются редкие фрагменты и учтённые URL
+        """
+        self.db_path = db_path or os.path.join(CACHE_DIR, "boilerplate_index.sqlite3")
+        self.min_pages = min_pages
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._pages_added = 0
+        self.stats = {"pages_indexed": 0, "segments_removed": 0}
+
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._connection = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS segments "
+            "(domain TEXT NOT NULL, hash INTEGER NOT NULL, pages INTEGER NOT NULL, seen_at REAL NOT NULL, "
+            "PRIMARY KEY (domain, hash))"
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS pages (url TEXT PRIMARY KEY, domain TEXT NOT NULL, seen_at REAL NOT NULL)"
+        )
+        # Отпечатки учтённых текстов: та же статья по другому адресу (метки, http/https, www) не считается новой страницей
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS texts "
+            "(domain TEXT NOT NULL, digest INTEGER NOT NULL, seen_at REAL NOT NULL, PRIMARY KEY (domain, digest))"
+        )
+        self._connection.commit()
+
+    def get(self, domain: str) -> Set[int]:
+        """Хеши шаблонных фрагментов домена"""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT hash FROM segments WHERE domain = ? AND pages >= ?", (domain, self.min_pages)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def is_indexed(self, url: str) -> bool:
+        """Страница уже учтена (хешировать её фрагменты повторно не нужно)"""
+        with self._lock:
+            return self._connection.execute(
+                "SELECT 1 FROM pages WHERE url = ?", (normalize_page_url(url),)
+            ).fetchone() is not None
+
+    def add_page(self, domain: str, url: str, hashes: List[int]) -> None:
+        """Учесть фрагменты новой страницы домена (тот же адрес или тот же текст повторно не учитываются)"""
+        if not hashes:
+            return
+
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR IGNORE INTO pages (url, domain, seen_at) VALUES (?, ?, ?)",
+                (normalize_page_url(url), domain, now)
+            )
+            inserted = self._connection.execute(
+                "INSERT OR IGNORE INTO texts (domain, digest, seen_at) VALUES (?, ?, ?)",
+                (domain, _text_digest(hashes), now)
+            ).rowcount
+            if not inserted:
+                self._connection.commit()
+                return
+
+            self._connection.executemany(
+                "INSERT INTO segments (domain, hash, pages, seen_at) VALUES (?, ?, 1, ?) "
+                "ON CONFLICT(domain, hash) DO UPDATE SET pages = pages + 1, seen_at = excluded.seen_at",
+                [(domain, segment, now) for segment in hashes]
+            )
+            self.stats["pages_indexed"] += 1
+
+            # Фрагменты одной-двух статей копятся быстрее всего — периодически забываем давно не встречавшиеся
+            self._pages_added += 1
+            if self._pages_added % 100 == 0:
+                self._connection.execute(
+                    "DELETE FROM segments WHERE pages < ? AND seen_at <= ?", (self.min_pages, now - self.ttl)
+                )
+                self._connection.execute("DELETE FROM pages WHERE seen_at <= ?", (now - self.ttl,))
+                self._connection.execute("DELETE FROM texts WHERE seen_at <= ?", (now - self.ttl,))
+            self._connection.commit()
+
+    def record_removed(self, count: int) -> None:
+        """Учесть удалённые при очистке фрагменты (очистка идёт в воркере, поэтому счёт ведёт вызывающий)"""
+        with self._lock:
+            self.stats["segments_removed"] += count
+
+    def get_stats(self) -> Dict:
+        """Счётчики текущего процесса и размер индекса"""
+        with self._lock:
+            domains, segments, boilerplate = self._connection.execute(
+                "SELECT COUNT(DISTINCT domain), COUNT(*), COALESCE(SUM(pages >= ?), 0) FROM segments",
+                (self.min_pages,)
+            ).fetchone()
+            return {
+                **self.stats,
+                "domains": domains,
+                "segments": segments,
+                "boilerplate_segments": boilerplate
+            }
+
+
+_boilerplate_index = None
+
+
+def get_boilerplate_index() -> BoilerplateIndex:
+    """Общий для процесса экземпляр (порог настраивается через BOILERPLATE_MIN_PAGES)"""
+    global _boilerplate_index
+    if _boilerplate_index is None:
+        _boilerplate_index = BoilerplateIndex(min_pages=int(os.getenv("BOILERPLATE_MIN_PAGES", 4)))
+    return _boilerplate_index
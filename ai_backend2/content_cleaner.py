@@ -3,15 +3,20 @@
 """
 
 import re
-from typing import List, Set
+from typing import List, Set, Optional
 from collections import Counter
+from boilerplate_index import split_segments, segment_hash
 
 
 class ContentCleaner:
-    def __init__(self, settings=None):
+    def __init__(self, settings=None, boilerplate: Optional[Set[int]] = None):
         # Настройки очистки
         self.settings = settings or {}
         
+        # Хеши шаблонного текста сайта (фрагменты, повторяющиеся на многих страницах домена)
+        self.boilerplate = boilerplate or set()
+        self.boilerplate_removed = 0
+        
         # Стоп-слова для фильтрации навигационных блоков
         self.navigation_keywords = {
             'главная', 'меню', 'навигация', 'войти', 'регистрация', 'поиск',
@@ -35,6 +40,21 @@ class ContentCleaner:
         # Максимальная длина параграфа (в символах)
         self.max_paragraph_length = self.settings.get('max_paragraph_length', 2000)
         
+    def _remove_boilerplate(self, text: str) -> str:
+        """Удаление шаблонного текста сайта: один поиск по хешу на фрагмент"""
+        pieces = split_segments(text)
+        kept = []
+        
+        for i in range(0, len(pieces), 2):
+            if segment_hash(pieces[i]) in self.boilerplate:
+                self.boilerplate_removed += 1
+                continue
+            kept.append(pieces[i])
+            if i + 1 < len(pieces):
+                kept.append(pieces[i + 1])
+        
+        return ''.join(kept).strip()
+    
     def _remove_technical_blocks(self, text: str) -> str:
         """Удаление технических блоков и навигации"""
         lines = text.split('\n')
@@ -179,6 +199,11 @@ class ContentCleaner:
         # Проверяем режим очистки
         mode = self.settings.get('mode', 'automatic')
         
+        # Шаблонный текст сайта убираем первым — остальным этапам достаётся меньше текста
+        if self.boilerplate and (mode != 'manual' or self.settings.get('remove_boilerplate', True)):
+            content = self._remove_boilerplate(content)
+            print(f"📊 После удаления шаблонного текста сайта: {len(content)} символов")
+        
         if mode == 'manual':
             # Ручная очистка с настройками пользователя
             if self.settings.get('remove_technical_blocks', True):
@@ -2,14 +2,42 @@
 Сервис для парсинга полного контента статей по URL
 """
 
-import requests
-import time
-from bs4 import BeautifulSoup
-from typing import List, Dict, Optional
+import os
+import asyncio
+import httpx
+from concurrent.futures import Executor
+from typing import List, Dict, Optional, Set, Tuple
 from urllib.parse import urljoin, urlparse
-import re
 from content_cleaner import ContentCleaner
 from text_chunker import TextChunker, TextChunk
+from fetch_engine import FetchEngine, PageRejected
+from article_cache import ArticleCache, get_article_cache, EXTRACTION, CLEANING, CHUNKING
+from parser_backends import get_parser_backend
+from template_store import TemplateStore, get_template_store
+from boilerplate_index import BoilerplateIndex, get_boilerplate_index, page_segment_hashes
+from alternate_store import (AlternateStore, get_alternate_store, find_alternates, canonical_of, same_page,
+                             alternate_pattern, alternate_url_for)
+
+
+# Версия алгоритма извлечения: входит в ключ кеша, чтобы после его изменения не отдавать старые результаты
+EXTRACTION_VERSION = 6
+
+# Облегчённая версия подходит, если текста в ней не меньше этого (и не меньше доли текста основной страницы при проверке)
+MIN_ALTERNATE_LENGTH = 500
+MIN_ALTERNATE_SHARE = 0.8
+
+# Проверка облегчённых версий нового домена идёт в фоне (статья отдаётся сразу) и ограничена по времени
+LIGHT_VERSION_PROBE_TIMEOUT = float(os.getenv("LIGHT_VERSION_PROBE_TIMEOUT", 15))
+_light_version_probes: Set[asyncio.Task] = set()
+
+
+async def stop_light_version_probes() -> None:
+    """Отменить незавершённые фоновые проверки облегчённых версий (вызывается при остановке приложения)"""
+    tasks = list(_light_version_probes)
+    for task in tasks:
+        task.cancel()
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
 
 
 class ArticleContent:
@@ -40,189 +68,381 @@ class ArticleContent:
             "chunks": [chunk.to_dict() for chunk in self.chunks],
             "chunking_stats": self.chunking_stats
         }
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ArticleContent":
+        article = cls(data["url"], data["title"], data["content"], data["meta_description"],
+                      data["cleaned_content"], data["content_stats"],
+                      [TextChunk(**chunk) for chunk in data["chunks"]], data["chunking_stats"])
+        article.word_count = data["word_count"]
+        article.cleaned_word_count = data["cleaned_word_count"]
+        return article
 
 
-class ContentParser:
+class ArticleProcessor:
+    """Извлечение → очистка → чанки для одной загруженной страницы (без сети, можно в отдельном процессе)"""
+    
     def __init__(self, enable_cleaning: bool = True, enable_chunking: bool = False, 
-                 chunk_size: int = 1000, cleaning_settings: dict = None):
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-            "Accept-Language": "ru-RU,ru;q=0.9,en;q=0.8",
-            "Accept-Encoding": "gzip, deflate, br",
-            "DNT": "1",
-            "Connection": "keep-alive",
-            "Upgrade-Insecure-Requests": "1"
-        }
-        self.timeout = 20
+                 chunk_size: int = 1000, cleaning_settings: dict = None,
+                 chunking_method: str = "paragraphs",
+                 parser_backend: Optional[str] = None,
+                 cache: Optional[ArticleCache] = None,
+                 boilerplate: Optional[Set[int]] = None,
+                 index_segments: bool = False):
+        # Бэкенд разбора HTML (html.parser, lxml или selectolax)
+        self.backend = get_parser_backend(parser_backend)
+        # Кеш результатов извлечения, очистки и чанкинга по хешу содержимого
+        self.cache = cache or get_article_cache()
         self.enable_cleaning = enable_cleaning
         self.enable_chunking = enable_chunking
+        self.chunk_size = chunk_size
+        self.chunking_method = chunking_method
         self.cleaning_settings = cleaning_settings or {}
-        self.cleaner = ContentCleaner(self.cleaning_settings) if enable_cleaning else None
+        # Хеши шаблонного текста домена страницы
+        self.boilerplate = set(boilerplate or ())
+        self.cleaner = ContentCleaner(self.cleaning_settings, self.boilerplate) if enable_cleaning else None
         self.chunker = TextChunker(target_chunk_size=chunk_size) if enable_chunking else None
+        # Какие этапы взяты из кеша (отдаётся в основной процесс для статистики)
+        self.cache_hits = {}
+        # Как сработал шаблон домена (отдаётся в основной процесс, None — извлечение из кеша)
+        self.template_outcome = None
+        # Хеши фрагментов новой страницы (основной процесс пополняет ими индекс шаблонного текста)
+        self.index_segments = index_segments
+        self.segment_hashes = []
         
-    def _clean_text(self, text: str) -> str:
-        """Очистка текста от лишних символов и форматирование"""
-        if not text:
-            return ""
-            
-        # Удаляем лишние пробелы и переносы строк
-        text = re.sub(r'\s+', ' ', text)
-        text = re.sub(r'\n\s*\n', '\n\n', text)
-        
-        # Удаляем HTML entities
-        text = text.replace('&nbsp;', ' ')
-        text = text.replace('&quot;', '"')
-        text = text.replace('&lt;', '<')
-        text = text.replace('&gt;', '>')
-        text = text.replace('&amp;', '&')
-        
-        return text.strip()
+    def _extract(self, url: str, html: str, template: Optional[List] = None) -> Dict:
+        """Извлечь title, meta description и основной текст (кешируется по хешу HTML)"""
+        key = self.cache.make_key(EXTRACTION_VERSION, self.backend.name, html)
+        extracted = self.cache.get(EXTRACTION, key)
+        self.cache_hits[EXTRACTION] = extracted is not None
+        if extracted is not None:
+            return extracted
+        
+        extracted = self.backend.extract(html, url, template)
+        self.template_outcome = {
+            "tried": template,
+            "extraction_path": extracted["extraction_path"],
+            "template": extracted["template"]
+        }
+        self.cache.set(EXTRACTION, key, extracted)
+        return extracted
     
-    def _extract_main_content(self, soup: BeautifulSoup, url: str) -> str:
-        """Извлечение основного контента из HTML"""
+    def _clean(self, content: str) -> Dict:
+        """Очистить текст и посчитать статистику (кешируется по хешу текста, настройкам и шаблонному тексту)"""
+        key = self.cache.make_key(content, self.cleaning_settings, sorted(self.boilerplate))
+        cleaned = self.cache.get(CLEANING, key)
+        self.cache_hits[CLEANING] = cleaned is not None
+        if cleaned is not None:
+            return cleaned
         
-        # Удаляем ненужные элементы
-        for tag in soup(['script', 'style', 'nav', 'header', 'footer', 
-                        'aside', 'advertisement', 'ads', 'sidebar']):
-            tag.decompose()
-            
-        # Удаляем элементы по классам и ID (типичный мусор)
-        unwanted_selectors = [
-            '[class*="nav"]', '[class*="menu"]', '[class*="header"]', 
-            '[class*="footer"]', '[class*="sidebar"]', '[class*="widget"]',
-            '[class*="ad"]', '[class*="banner"]', '[class*="popup"]',
-            '[id*="nav"]', '[id*="menu"]', '[id*="header"]', 
-            '[id*="footer"]', '[id*="sidebar"]'
-        ]
-        
-        for selector in unwanted_selectors:
-            for element in soup.select(selector):
-                element.decompose()
-        
-        # Пытаемся найти основной контент по популярным селекторам
-        content_selectors = [
-            'article', '[role="main"]', 'main', '.content', '.post-content',
-            '.entry-content', '.article-content', '.post-body', '.text',
-            '.post', '.blog-post', '.article', '.story', '.news-content',
-            '.page-content', '.main-content', '.content-area', '.entry',
-            '.post-text', '.article-text', '.content-text', '.text-content',
-            '#content', '#main', '.main-content'
-        ]
-        
-        main_content = None
-        for selector in content_selectors:
-            elements = soup.select(selector)
-            if elements:
-                # Выбираем элемент с наибольшим количеством текста
-                main_content = max(elements, key=lambda x: len(x.get_text()))
-                break
-        
-        # Если не нашли по селекторам, ищем по тегам
-        if not main_content:
-            for tag in ['article', 'main', 'div']:
-                elements = soup.find_all(tag)
-                if elements:
-                    # Берем элемент с наибольшим количеством текста
-                    main_content = max(elements, key=lambda x: len(x.get_text()))
-                    break
-        
-        if not main_content:
-            main_content = soup
+        cleaned_content = self.cleaner.clean_content(content)
+        cleaned = {
+            "cleaned_content": cleaned_content,
+            "content_stats": self.cleaner.get_content_stats(cleaned_content)
+        }
+        self.cache.set(CLEANING, key, cleaned)
+        return cleaned
+    
+    def _chunk(self, text: str) -> Dict:
+        """Разбить текст на чанки (кешируется по хешу текста, размеру чанка и методу)"""
+        key = self.cache.make_key(text, self.chunk_size, self.chunking_method)
+        chunked = self.cache.get(CHUNKING, key)
+        self.cache_hits[CHUNKING] = chunked is not None
+        if chunked is not None:
+            return chunked
+        
+        chunks = self.chunker.chunk_text(text, method=self.chunking_method)
+        chunked = {
+            "chunks": [chunk.to_dict() for chunk in chunks],
+            "chunking_stats": self.chunker.get_chunking_stats(chunks)
+        }
+        self.cache.set(CHUNKING, key, chunked)
+        return chunked
+    
+    def process(self, url: str, html: str, template: Optional[List] = None) -> Optional[ArticleContent]:
+        """Извлечение, очистка и разбиение на чанки загруженной страницы (template — шаблон домена)"""
+        extracted = self._extract(url, html, template)
+        content = extracted["content"]
+        
+        if len(content) < 50:
+            print(f"⚠️ Мало контента ({len(content)} символов): {url}")
+            return None
+        
+        if self.index_segments:
+            self.segment_hashes = page_segment_hashes(content)
+        
+        # Очистка контента (если включена)
+        cleaned_content = content
+        content_stats = {}
+        
+        if self.enable_cleaning and self.cleaner:
+            cleaned = self._clean(content)
+            cleaned_content = cleaned["cleaned_content"]
+            content_stats = cleaned["content_stats"]
             
-        # Извлекаем текст из параграфов и заголовков
-        content_parts = []
-        
-        # Приоритет: p, div, span с достаточным количеством текста
-        for tag in main_content.find_all(['p', 'div', 'span', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li']):
-            text = tag.get_text().strip()
-            if len(text) > 20:  # Уменьшили минимум до 20 символов
-                content_parts.append(text)
-        
-        # Если мало контента, берем весь текст
-        if len(' '.join(content_parts)) < 150:
-            content_parts = [main_content.get_text()]
+            if len(cleaned_content) < 50:
+                print(f"⚠️ После очистки мало контента ({len(cleaned_content)} символов): {url}")
+                return None
+        
+        # Создание чанков (если включено)
+        chunks = []
+        chunking_stats = {}
+        
+        if self.enable_chunking and self.chunker:
+            text_for_chunking = cleaned_content if cleaned_content else content
+            chunked = self._chunk(text_for_chunking)
+            chunks = [TextChunk(**chunk) for chunk in chunked["chunks"]]
+            chunking_stats = chunked["chunking_stats"]
             
-        full_content = '\n\n'.join(content_parts)
-        return self._clean_text(full_content)
+        # Каким путём получен текст: структурированные данные, шаблон домена или эвристики
+        content_stats = {**content_stats, "extraction_path": extracted["extraction_path"]}
+        
+        article = ArticleContent(url, extracted["title"], content, extracted["meta_description"], 
+                               cleaned_content, content_stats, chunks, chunking_stats)
+        
+        chunk_info = f" (чанков: {len(chunks)})" if chunks else ""
+        print(f"✅ Успешно спарсено: {article.word_count} слов (очищено: {article.cleaned_word_count} слов){chunk_info}")
+        
+        return article
+    
+
+
+def process_document(url: str, html: str, options: Dict,
+                     hints: Optional[Dict] = None) -> Tuple[Optional[Dict], Dict]:
+    """
+    Обработать одну страницу; выполняется в пуле процессов, поэтому возвращает только компактные dict
+
+    Args:
+        hints: Что известно о домене: {"template": путь к контейнеру, "boilerplate": хеши шаблонного текста,
+               "index_page": страница ещё не учтена в индексе шаблонного текста}
+
+    Returns:
+        (статья или None, отчёт для основного процесса: попадания в кеш, шаблон, фрагменты страницы)
+    """
+    hints = hints or {}
+    processor = ArticleProcessor(**options, boilerplate=hints.get("boilerplate"),
+                                 index_segments=hints.get("index_page", False))
+    article = processor.process(url, html, hints.get("template"))
+    report = {
+        "cache_hits": processor.cache_hits,
+        "template": processor.template_outcome,
+        "segments": processor.segment_hashes,
+        "boilerplate_removed": processor.cleaner.boilerplate_removed if processor.cleaner else 0
+    }
+    return (article.to_dict() if article else None), report
+
+
+class ContentParser:
+    def __init__(self, enable_cleaning: bool = True, enable_chunking: bool = False, 
+                 chunk_size: int = 1000, cleaning_settings: dict = None,
+                 chunking_method: str = "paragraphs",
+                 parser_backend: Optional[str] = None,
+                 fetch_engine: Optional[FetchEngine] = None,
+                 executor: Optional[Executor] = None,
+                 cache: Optional[ArticleCache] = None,
+                 template_store: Optional[TemplateStore] = None,
+                 boilerplate_index: Optional[BoilerplateIndex] = None,
+                 prefer_light_version: bool = False,
+                 alternate_store: Optional[AlternateStore] = None):
+        # Общий загрузчик процесса (если не передан — свой, с временным клиентом на запрос)
+        self.fetch_engine = fetch_engine or FetchEngine()
+        # Пул процессов для CPU-работы (None — обработка в потоке)
+        self.executor = executor
+        self.cache = cache or get_article_cache()
+        # Шаблоны извлечения по доменам: воркер получает путь к контейнеру, основной процесс его запоминает
+        self.templates = template_store or get_template_store()
+        # Шаблонный текст по доменам: воркер получает хеши для очистки, основной процесс пополняет индекс
+        self.boilerplate = boilerplate_index or get_boilerplate_index()
+        # Загружать AMP / версию для печати вместо основной страницы там, где они проверены
+        self.prefer_light_version = prefer_light_version
+        self.alternates = (alternate_store or get_alternate_store()) if prefer_light_version else None
+        # Неизвестный или неустановленный бэкенд — ошибка сразу, а не в воркере пула
+        parser_backend = get_parser_backend(parser_backend).name
+        # Настройки обработки передаются в воркер пула вместе с HTML
+        self.processing_options = {
+            "enable_cleaning": enable_cleaning,
+            "enable_chunking": enable_chunking,
+            "chunk_size": chunk_size,
+            "cleaning_settings": cleaning_settings or {},
+            "chunking_method": chunking_method,
+            "parser_backend": parser_backend
+        }
+    
+    async def _process(self, url: str, html: str,
+                       alternate: Optional[Tuple[str, str]] = None) -> Optional[ArticleContent]:
+        """
+        Обработать страницу вне event loop: в пуле процессов или в потоке
+
+        Args:
+            url: URL статьи
+            html: Загруженная страница
+            alternate: (вид, URL), если загружена облегчённая версия — шаблон и шаблонный текст у неё свои
+        """
+        domain = self.templates.domain_of(url)
+        source_url = url
+        if alternate:
+            domain = f"{domain}#{alternate[0]}"
+            source_url = alternate[1]
+        hints = await asyncio.to_thread(self._domain_hints, domain, source_url)
+        
+        if self.executor is not None:
+            loop = asyncio.get_running_loop()
+            data, report = await loop.run_in_executor(
+                self.executor, process_document, url, html, self.processing_options, hints
+            )
+        else:
+            data, report = await asyncio.to_thread(process_document, url, html, self.processing_options, hints)
+        
+        self.cache.record_hits(report["cache_hits"])
+        await asyncio.to_thread(self._record_report, domain, source_url, report, data is not None)
+        return ArticleContent.from_dict(data) if data else None
+    
+    def _domain_hints(self, domain: str, url: str) -> Dict:
+        """Шаблон извлечения и шаблонный текст домена (обращение к SQLite — вызывается в потоке)"""
+        boilerplate = self.boilerplate.get(domain) if self.processing_options["enable_cleaning"] else set()
+        return {
+            "template": self.templates.get(domain),
+            "boilerplate": boilerplate,
+            "index_page": not self.boilerplate.is_indexed(url)
+        }
+    
+    def _record_report(self, domain: str, url: str, report: Dict, accepted: bool) -> None:
+        """Учесть результат обработки: шаблон домена и фрагменты принятой статьи (вызывается в потоке)"""
+        self.templates.record(domain, report["template"], accepted)
+        if accepted:
+            self.boilerplate.add_page(domain, url, report["segments"])
+        self.boilerplate.record_removed(report["boilerplate_removed"])
     
-    def parse_article(self, url: str) -> Optional[ArticleContent]:
+    async def parse_article(self, url: str) -> Optional[ArticleContent]:
         """Парсинг одной статьи по URL"""
         try:
             print(f"📄 Парсинг: {url}")
             
-            response = requests.get(url, headers=self.headers, timeout=self.timeout)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Извлекаем title
-            title_tag = soup.find('title')
-            title = title_tag.get_text().strip() if title_tag else "Заголовок не найден"
-            
-            # Извлекаем meta description
-            meta_desc_tag = soup.find('meta', attrs={'name': 'description'})
-            meta_description = ""
-            if meta_desc_tag and meta_desc_tag.get('content'):
-                meta_description = meta_desc_tag['content'].strip()
-            
-            # Извлекаем основной контент
-            content = self._extract_main_content(soup, url)
-            
-            if len(content) < 50:
-                print(f"⚠️ Мало контента ({len(content)} символов): {url}")
-                return None
-            
-            # Очистка контента (если включена)
-            cleaned_content = content
-            content_stats = {}
-            
-            if self.enable_cleaning and self.cleaner:
-                cleaned_content = self.cleaner.clean_content(content)
-                content_stats = self.cleaner.get_content_stats(cleaned_content)
-                
-                if len(cleaned_content) < 50:
-                    print(f"⚠️ После очистки мало контента ({len(cleaned_content)} символов): {url}")
-                    return None
-            
-            # Создание чанков (если включено)
-            chunks = []
-            chunking_stats = {}
+            if self.prefer_light_version:
+                article = await self._parse_light_version(url)
+                if article:
+                    return article
             
-            if self.enable_chunking and self.chunker:
-                text_for_chunking = cleaned_content if cleaned_content else content
-                chunks = self.chunker.chunk_text(text_for_chunking)
-                chunking_stats = self.chunker.get_chunking_stats(chunks)
-                
-            article = ArticleContent(url, title, content, meta_description, 
-                                   cleaned_content, content_stats, chunks, chunking_stats)
-            
-            chunk_info = f" (чанков: {len(chunks)})" if chunks else ""
-            print(f"✅ Успешно спарсено: {article.word_count} слов (очищено: {article.cleaned_word_count} слов){chunk_info}")
+            html = await self.fetch_engine.fetch(url)
+            article = await self._process(url, html)
             
+            if self.prefer_light_version and article:
+                # Проверка облегчённой версии — дополнительная работа: статья её не ждёт и от её сбоя не зависит
+                task = asyncio.create_task(self._probe_light_version(url, html, len(article.content)))
+                _light_version_probes.add(task)
+                task.add_done_callback(_light_version_probes.discard)
             return article
             
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             print(f"❌ Ошибка запроса {url}: {str(e)}")
             return None
+        except PageRejected as e:
+            print(f"⛔ Страница пропущена, {str(e)}")
+            return None
         except Exception as e:
             print(f"❌ Ошибка парсинга {url}: {str(e)}")
             return None
     
-    def parse_multiple_articles(self, urls: List[str], delay: float = 1.0) -> List[ArticleContent]:
-        """Парсинг нескольких статей с задержкой между запросами"""
-        articles = []
+    async def _fetch_alternate(self, url: str, kind: str, alternate_url: str) -> Optional[ArticleContent]:
+        """
+        Загрузить и обработать облегчённую версию статьи
+
+        Любая ошибка здесь — повод вернуться к основной странице, а не потерять статью, поэтому наружу
+        исключения не выходят: None — версия недоступна, не разобралась, не та страница или мало текста.
+        """
+        try:
+            html = await self.fetch_engine.fetch(alternate_url)
+        except (httpx.HTTPError, PageRejected) as e:
+            print(f"⚠️ Облегчённая версия недоступна {alternate_url}: {str(e)}")
+            return None
+        except Exception as e:
+            print(f"⚠️ Ошибка загрузки облегчённой версии {alternate_url}: {str(e)}")
+            return None
         
-        for i, url in enumerate(urls, 1):
-            print(f"\n[{i}/{len(urls)}] Обработка URL...")
-            
-            article = self.parse_article(url)
-            if article:
-                articles.append(article)
+        try:
+            # AMP обязана ссылаться на основную страницу — иначе шаблон адреса дал чужую статью
+            canonical = canonical_of(html, alternate_url)
+            if canonical and not same_page(canonical, url):
+                print(f"⚠️ Облегчённая версия {alternate_url} ссылается на другую страницу: {canonical}")
+                return None
             
-            # Задержка между запросами
-            if i < len(urls):
-                time.sleep(delay)
+            article = await self._process(url, html, (kind, alternate_url))
+        except Exception as e:
+            print(f"⚠️ Ошибка разбора облегчённой версии {alternate_url}: {str(e)}")
+            return None
+        
+        if article and len(article.content) >= MIN_ALTERNATE_LENGTH:
+            return article
+        return None
+    
+    async def _parse_light_version(self, url: str) -> Optional[ArticleContent]:
+        """Статья из облегчённой версии, если она известна для домена (None — загружать основную страницу)"""
+        domain = self.templates.domain_of(url)
+        known = await asyncio.to_thread(self.alternates.get, domain)
+        alternate_url = alternate_url_for(known["pattern"], url) if known else None
+        if not alternate_url:
+            return None
+        
+        article = await self._fetch_alternate(url, known["kind"], alternate_url)
+        await asyncio.to_thread(self.alternates.record, domain, article is not None)
+        if article:
+            print(f"🪶 Статья взята из облегчённой версии ({known['kind']}): {alternate_url}")
+        else:
+            print(f"↩️ Откат на основную страницу: {url}")
+        return article
+    
+    async def _find_light_version(self, url: str, html: str,
+                                  content_length: int) -> Tuple[Optional[str], Optional[str]]:
+        """Первая облегчённая версия из объявленных страницей, которая даёт не меньше текста: (вид, шаблон URL)"""
+        for kind, alternate_url in find_alternates(html, url):
+            pattern = alternate_pattern(url, alternate_url)
+            if not pattern:
+                continue
+            alternate_article = await self._fetch_alternate(url, kind, alternate_url)
+            if alternate_article and len(alternate_article.content) >= MIN_ALTERNATE_SHARE * content_length:
+                return kind, pattern
+        return None, None
+    
+    async def _probe_light_version(self, url: str, html: str, content_length: int) -> None:
+        """
+        Фоновая проверка облегчённых версий домена (запускается после разбора основной страницы)
+
+        Исключения наружу не выходят: итог проверки — только запись в хранилище облегчённых версий.
+        """
+        domain = self.templates.domain_of(url)
+        try:
+            if not await asyncio.to_thread(self.alternates.begin_probe, domain):
+                return
+        except Exception as e:
+            print(f"⚠️ Ошибка хранилища облегчённых версий для {domain}: {str(e)}")
+            return
+        
+        kind = pattern = None
+        try:
+            kind, pattern = await asyncio.wait_for(
+                self._find_light_version(url, html, content_length), LIGHT_VERSION_PROBE_TIMEOUT
+            )
+        except asyncio.CancelledError:
+            # Остановка приложения — итога нет, домен проверится при следующем обращении
+            self.alternates.cancel_probe(domain)
+            raise
+        except asyncio.TimeoutError:
+            print(f"⏱️ Проверка облегчённой версии {domain} не уложилась в {LIGHT_VERSION_PROBE_TIMEOUT:g} с")
+        except Exception as e:
+            print(f"⚠️ Ошибка проверки облегчённой версии {domain}: {str(e)}")
+        
+        if pattern:
+            print(f"🪶 Для {domain} запомнена облегчённая версия ({kind}): {pattern}")
+        try:
+            await asyncio.to_thread(self.alternates.learn, domain, kind, pattern)
+        except Exception as e:
+            self.alternates.cancel_probe(domain)
+            print(f"⚠️ Ошибка хранилища облегчённых версий для {domain}: {str(e)}")
+    
+    async def parse_multiple_articles(self, urls: List[str]) -> List[ArticleContent]:
+        """Параллельный парсинг нескольких статей (порядок результатов сохраняется)"""
+        results = await asyncio.gather(*(self.parse_article(url) for url in urls))
+        articles = [article for article in results if article]
         
         print(f"\n📊 Результат: успешно спарсено {len(articles)} из {len(urls)} статей")
-        return articles
\ No newline at end of file
+        return articles
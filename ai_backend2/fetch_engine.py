@@ -0,0 +1,255 @@
+"""
+Асинхронная загрузка страниц-источников: общий лимит параллелизма и вежливость к каждому сайту
+"""
+
+import os
+import time
+import asyncio
+import httpx
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+from fastapi import Request
+from page_cache import CachedPage, PageCache, get_page_cache
+from html_head import detect_charset, decode_html
+
+
+# Сколько страниц процесс загружает одновременно (на все запросы к API вместе)
+DEFAULT_FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", 10))
+# Вежливость к одному сайту: запросов в секунду и допустимая пачка подряд
+DEFAULT_HOST_RATE = float(os.getenv("FETCH_HOST_RATE", 1.0))
+DEFAULT_HOST_BURST = int(os.getenv("FETCH_HOST_BURST", 2))
+
+# Максимальный размер страницы после распаковки: больше — загрузка прерывается
+DEFAULT_MAX_BODY_SIZE = int(float(os.getenv("FETCH_MAX_BODY_MB", 5)) * 1024 * 1024)
+
+# Ответы, после которых сайт просит подождать
+RETRY_STATUS_CODES = (429, 503)
+
+# Content-Type, которые разбираем как HTML (ответ без Content-Type тоже принимаем)
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+DEFAULT_FETCH_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+    "Accept-Language": "ru-RU,ru;q=0.9,en;q=0.8",
+    "DNT": "1",
+    "Upgrade-Insecure-Requests": "1"
+}
+
+
+class PageRejected(Exception):
+    """Страница не загружена: не HTML или больше допустимого размера"""
+
+
+class _HostState:
+    def __init__(self, tokens: float, updated_at: float):
+        self.tokens = tokens
+        self.updated_at = updated_at
+        self.blocked_until = 0.0
+        self.failures = 0
+
+
+class HostScheduler:
+    """Token bucket на каждый хост + пауза после 429/503 (разные хосты не ждут друг друга)"""
+
+    def __init__(self, rate: float = DEFAULT_HOST_RATE, burst: int = DEFAULT_HOST_BURST,
+                 backoff_base: float = 1.0, backoff_max: float = 60.0, max_hosts: int = 1000):
+        """
+        Args:
+            rate: Сколько запросов в секунду разрешено к одному хосту
+            burst: Сколько запросов подряд можно отправить без ожидания
+            backoff_base: Первая пауза после 429/503 без Retry-After (далее удваивается)
+            backoff_max: Максимальная пауза для хоста в секундах
+            max_hosts: После скольких хостов вычищать неактивные
+        """
+        self.rate = rate
+        self.burst = burst
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_hosts = max_hosts
+        self._hosts: Dict[str, _HostState] = {}
+
+    def _get_state(self, host: str, now: float) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            if len(self._hosts) >= self.max_hosts:
+                self._prune(now)
+            state = _HostState(tokens=self.burst, updated_at=now)
+            self._hosts[host] = state
+        return state
+
+    def _prune(self, now: float) -> None:
+        """Убрать хосты с полным ведром и без активной паузы"""
+        for host, state in list(self._hosts.items()):
+            idle_tokens = state.tokens + (now - state.updated_at) * self.rate
+            if idle_tokens >= self.burst and state.blocked_until <= now:
+                del self._hosts[host]
+
+    async def acquire(self, host: str) -> None:
+        """Дождаться разрешения на запрос к хосту"""
+        now = time.monotonic()
+        state = self._get_state(host, now)
+
+        # Резервируем токен сразу: параллельные запросы к хосту встают в очередь по времени
+        state.tokens = min(self.burst, state.tokens + (now - state.updated_at) * self.rate)
+        state.updated_at = now
+        state.tokens -= 1
+        wait = -state.tokens / self.rate if state.tokens < 0 else 0.0
+
+        await asyncio.sleep(max(wait, state.blocked_until - now))
+
+        # Пока ждали, хост мог ответить 429/503 на соседний запрос
+        while state.blocked_until > time.monotonic():
+            await asyncio.sleep(state.blocked_until - time.monotonic())
+
+    def report(self, host: str, status_code: int, retry_after: Optional[str] = None) -> float:
+        """Учесть ответ хоста; возвращает назначенную паузу (0 — без паузы)"""
+        state = self._get_state(host, time.monotonic())
+
+        if status_code not in RETRY_STATUS_CODES:
+            state.failures = 0
+            return 0.0
+
+        state.failures += 1
+        delay = _parse_retry_after(retry_after)
+        if delay is None:
+            delay = self.backoff_base * 2 ** (state.failures - 1)
+        delay = min(delay, self.backoff_max)
+
+        state.blocked_until = max(state.blocked_until, time.monotonic() + delay)
+        print(f"⏳ {host} ответил {status_code}, пауза {delay:.1f} с")
+        return delay
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After в секундах или как HTTP-дата (None — заголовка нет или он битый)"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class FetchEngine:
+    def __init__(self, client: Optional[httpx.AsyncClient] = None,
+                 concurrency: int = DEFAULT_FETCH_CONCURRENCY,
+                 timeout: float = 20.0, headers: Optional[dict] = None,
+                 scheduler: Optional[HostScheduler] = None, max_retries: int = 2,
+                 max_retry_wait: float = 10.0, cache: Optional[PageCache] = None,
+                 max_body_size: int = DEFAULT_MAX_BODY_SIZE):
+        """
+        Инициализация загрузчика
+
+        Args:
+            client: Общий пул соединений к сайтам (None — временный клиент на загрузку)
+            concurrency: Максимум одновременных загрузок на процесс
+            timeout: Таймаут одной загрузки в секундах
+            headers: Заголовки запросов (по умолчанию — как у браузера)
+            scheduler: Планировщик частоты запросов к хостам
+            max_retries: Сколько раз повторять запрос после 429/503
+            max_retry_wait: Дольше этой паузы не ждём повтора, а сразу отдаём ошибку
+            cache: Дисковый HTTP-кеш страниц
+            max_body_size: Максимальный размер страницы в байтах (после распаковки)
+        """
+        self.client = client
+        self.concurrency = concurrency
+        self.timeout = httpx.Timeout(timeout)
+        # Accept-Encoding и Connection выставляет сам httpx (сжатие и keep-alive пула)
+        self.headers = headers or DEFAULT_FETCH_HEADERS
+        self.scheduler = scheduler or HostScheduler()
+        self.max_retries = max_retries
+        self.max_retry_wait = max_retry_wait
+        self.cache = cache or get_page_cache()
+        self.max_body_size = max_body_size
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    @asynccontextmanager
+    async def _client_session(self):
+        """Общий клиент или временный клиент на время загрузки"""
+        if self.client is not None:
+            yield self.client
+        else:
+            async with httpx.AsyncClient() as client:
+                yield client
+
+    def _check_headers(self, url: str, response: httpx.Response) -> None:
+        """Отказаться от загрузки тела по заголовкам: не HTML или заведомо слишком большое"""
+        content_type = response.headers.get("content-type")
+        if content_type:
+            mime_type = content_type.split(";", 1)[0].strip().lower()
+            if mime_type not in HTML_CONTENT_TYPES:
+                raise PageRejected(f"не HTML ({mime_type}): {url}")
+
+        # Content-Length — размер до распаковки, поэтому годится только для раннего отказа
+        content_length = response.headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) > self.max_body_size:
+            raise PageRejected(f"больше {self.max_body_size} байт: {url}")
+
+    async def _download(self, url: str, headers: Dict[str, str]) -> Tuple[httpx.Response, Optional[bytes]]:
+        """Потоковая загрузка с ограничением размера (тело читается только у успешного ответа)"""
+        async with self._semaphore:
+            async with self._client_session() as client:
+                async with client.stream("GET", url, headers=headers, timeout=self.timeout,
+                                         follow_redirects=True) as response:
+                    if not response.is_success:
+                        return response, None
+
+                    self._check_headers(url, response)
+                    buffer = bytearray()
+                    async for chunk in response.aiter_bytes():
+                        buffer.extend(chunk)
+                        if len(buffer) > self.max_body_size:
+                            raise PageRejected(f"больше {self.max_body_size} байт: {url}")
+
+        return response, bytes(buffer)
+
+    async def fetch(self, url: str) -> str:
+        """Загрузить страницу и декодировать её: свежая копия из кеша, перепроверка устаревшей или загрузка"""
+        cached = await asyncio.to_thread(self.cache.get, url)
+        if cached and cached.is_fresh:
+            return self._decode_cached(cached)
+
+        host = urlparse(url).netloc.lower()
+        headers = {**self.headers, **cached.conditional_headers()} if cached else self.headers
+
+        for attempt in range(self.max_retries + 1):
+            # Сначала ждём очередь хоста, не занимая общий слот — другие сайты тем временем грузятся
+            await self.scheduler.acquire(host)
+            response, body = await self._download(url, headers)
+
+            pause = self.scheduler.report(host, response.status_code, response.headers.get("retry-after"))
+            if (response.status_code not in RETRY_STATUS_CODES or attempt == self.max_retries
+                    or pause > self.max_retry_wait):
+                break
+
+        if response.status_code == 304 and cached:
+            await asyncio.to_thread(self.cache.revalidate, url)
+            return self._decode_cached(cached)
+
+        response.raise_for_status()
+
+        # Кодировка из заголовка или <meta charset> — декодируем один раз, парсер её не угадывает
+        charset = detect_charset(response.headers.get("content-type"), body)
+        if "no-store" not in response.headers.get("cache-control", "").lower():
+            await asyncio.to_thread(
+                self.cache.store, url, body,
+                response.headers.get("etag"), response.headers.get("last-modified"), charset
+            )
+        return decode_html(body, charset)
+
+    @staticmethod
+    def _decode_cached(cached: CachedPage) -> str:
+        """Декодировать копию из кеша (у старых записей кодировка не сохранена — ищем <meta charset>)"""
+        return decode_html(cached.body, cached.charset or detect_charset(None, cached.body))
+
+
+def get_fetch_engine(request: Request) -> FetchEngine:
+    """Зависимость FastAPI: общий загрузчик страниц, созданный при старте приложения"""
+    return request.app.state.fetch_engine
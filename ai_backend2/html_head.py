@@ -0,0 +1,134 @@
+"""
+Лёгкое извлечение title и meta description из <head> HTML-страницы
+"""
+
+import re
+from html.parser import HTMLParser
+from typing import Optional
+
+
+HEAD_END_MARKER = b"</head"
+DEFAULT_HEAD_BYTES_LIMIT = 64 * 1024
+
+_CHARSET_RE = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([a-zA-Z0-9_\-]+)""", re.IGNORECASE)
+_HEADER_CHARSET_RE = re.compile(r"charset\s*=\s*[\"']?([a-zA-Z0-9_\-]+)", re.IGNORECASE)
+_HEAD_END_RE = re.compile(r"</head\s*>|<body\b", re.IGNORECASE)
+
+
+class HeadMeta:
+    def __init__(self, title: str = "", description: str = "", charset: Optional[str] = None,
+                 og_title: str = "", og_description: str = "",
+                 canonical_url: str = "", amp_url: str = "", print_url: str = ""):
+        self.title = title
+        self.description = description
+        self.charset = charset
+        # OpenGraph (og:title / og:description) — запасные значения, если основных нет
+        self.og_title = og_title
+        self.og_description = og_description
+        # <link rel="canonical">, <link rel="amphtml"> и версия для печати (<link rel="alternate" media="print">)
+        self.canonical_url = canonical_url
+        self.amp_url = amp_url
+        self.print_url = print_url
+
+
+class _HeadMetaParser(HTMLParser):
+    """Токенизатор, который собирает только <title>, <meta name="description">, OpenGraph-теги и <link> версий страницы"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title_parts = []
+        self.title_found = False
+        self.description = ""
+        self.og = {}
+        self.links = {}
+        self.finished = False
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if self.finished:
+            return
+
+        if tag == "title" and not self.title_found:
+            self._in_title = True
+        elif tag == "meta":
+            attributes = dict(attrs)
+            content = (attributes.get("content") or "").strip()
+            if not content:
+                return
+            if (attributes.get("name") or "").lower() == "description" and not self.description:
+                self.description = content
+            prop = (attributes.get("property") or "").lower()
+            if prop in ("og:title", "og:description"):
+                self.og.setdefault(prop, content)
+        elif tag == "link":
+            attributes = dict(attrs)
+            href = (attributes.get("href") or "").strip()
+            rel = (attributes.get("rel") or "").lower().split()
+            if not href:
+                return
+            if "canonical" in rel:
+                self.links.setdefault("canonical", href)
+            elif "amphtml" in rel:
+                self.links.setdefault("amphtml", href)
+            elif "alternate" in rel and "print" in (attributes.get("media") or "").lower():
+                self.links.setdefault("print", href)
+        elif tag == "body":
+            self.finished = True
+
+    def handle_endtag(self, tag):
+        if tag == "title" and self._in_title:
+            self._in_title = False
+            self.title_found = True
+        elif tag == "head":
+            self.finished = True
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title_parts.append(data)
+
+
+def find_head_end(buffer: bytes, start: int = 0) -> int:
+    """Позиция закрывающего </head> в буфере (или -1, если ещё не получен)"""
+    position = bytes(buffer[start:]).lower().find(HEAD_END_MARKER)
+    return start + position if position != -1 else -1
+
+
+def detect_charset(content_type: Optional[str], buffer: bytes) -> str:
+    """Кодировка из заголовка Content-Type или <meta charset>, по умолчанию utf-8"""
+    if content_type:
+        match = _HEADER_CHARSET_RE.search(content_type)
+        if match:
+            return match.group(1).lower()
+
+    match = _CHARSET_RE.search(buffer[:DEFAULT_HEAD_BYTES_LIMIT])
+    if match:
+        return match.group(1).decode("ascii").lower()
+
+    return "utf-8"
+
+
+def decode_html(buffer: bytes, charset: str) -> str:
+    """Декодировать HTML с заменой битых байтов (неизвестная кодировка → utf-8)"""
+    try:
+        return buffer.decode(charset, errors="replace")
+    except LookupError:
+        return buffer.decode("utf-8", errors="replace")
+
+
+def head_section(html: str) -> str:
+    """Начало документа до </head> или <body> (не больше DEFAULT_HEAD_BYTES_LIMIT, если конец не найден)"""
+    head_end = _HEAD_END_RE.search(html)
+    return html[:head_end.start()] if head_end else html[:DEFAULT_HEAD_BYTES_LIMIT]
+
+
+def extract_head_meta(html: str) -> HeadMeta:
+    """Извлечь title и meta description из начала HTML-документа"""
+    parser = _HeadMetaParser()
+    parser.feed(html)
+    parser.close()
+
+    title = " ".join("".join(parser.title_parts).split())
+    return HeadMeta(title=title, description=parser.description,
+                    og_title=parser.og.get("og:title", ""), og_description=parser.og.get("og:description", ""),
+                    canonical_url=parser.links.get("canonical", ""), amp_url=parser.links.get("amphtml", ""),
+                    print_url=parser.links.get("print", ""))
@@ -0,0 +1,47 @@
+"""
+Общие пулы HTTP-соединений для внешних сервисов (создаются в lifespan приложения)
+"""
+
+import httpx
+from fastapi import Request
+
+
+class HttpClients:
+    """Отдельный пул соединений на каждый внешний сервис"""
+
+    def __init__(self):
+        # Yandex Search API и Operation API: HTTP/2, много параллельных опросов операций
+        self.yandex_search = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=60),
+            timeout=httpx.Timeout(15.0, connect=5.0)
+        )
+        # Yandex IAM: редкие запросы на обновление токена
+        self.yandex_iam = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=5, max_keepalive_connections=2, keepalive_expiry=60),
+            timeout=httpx.Timeout(10.0, connect=5.0)
+        )
+        # Сайты-источники: статьи и дозагрузка title/description для выдачи
+        self.articles = httpx.AsyncClient(
+            http2=True,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=30, keepalive_expiry=30),
+            timeout=httpx.Timeout(20.0, connect=10.0)
+        )
+        # text.ru: HTTP/1.1, долгие ответы на проверку текста
+        self.text_ru = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=5, keepalive_expiry=60),
+            timeout=httpx.Timeout(30.0, connect=10.0)
+        )
+
+    async def aclose(self) -> None:
+        """Закрыть все пулы соединений"""
+        for client in (self.yandex_search, self.yandex_iam, self.articles, self.text_ru):
+            await client.aclose()
+
+
+def get_http_clients(request: Request) -> HttpClients:
+    """Зависимость FastAPI: пулы соединений, созданные при старте приложения"""
+    return request.app.state.http_clients
+
@@ -2,14 +2,46 @@
 FastAPI приложение для SEO Copywriter модуля
 """
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from seo_router import router as seo_router
+from yandex_auth import get_auth_service
+from http_clients import HttpClients
+from fetch_engine import FetchEngine
+from parse_pool import create_parse_pool
+from content_parser import stop_light_version_probes
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Общие ресурсы процесса: пулы HTTP-соединений, загрузчик страниц, пул обработки и фоновое обновление IAM токена Yandex
+    (при остановке сначала гасятся фоновые задачи, которые этими ресурсами пользуются)
+    """
+    http_clients = HttpClients()
+    app.state.http_clients = http_clients
+    app.state.fetch_engine = FetchEngine(client=http_clients.articles)
+    parse_pool = create_parse_pool()
+    app.state.parse_pool = parse_pool
+    
+    auth_service = get_auth_service()
+    auth_service.client = http_clients.yandex_iam
+    auth_service.start_background_refresh()
+    yield
+    await auth_service.stop_background_refresh()
+    await stop_light_version_probes()
+    auth_service.client = None
+    if parse_pool is not None:
+        parse_pool.shutdown(wait=False, cancel_futures=True)
+    await http_clients.aclose()
+
 
 app = FastAPI(
     title="TRIVE SEO Copywriter API",
     description="API для модуля SEO Copywriter - поиск и генерация контента",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Увеличиваем лимиты для больших статей
@@ -0,0 +1,171 @@
+"""
+Дисковый HTTP-кеш загруженных страниц-источников с условной перепроверкой (ETag / Last-Modified)
+"""
+
+import os
+import time
+import zlib
+import sqlite3
+import threading
+from typing import Dict, Optional
+from search_cache import CACHE_DIR
+
+
+class CachedPage:
+    def __init__(self, url: str, body: bytes, etag: Optional[str], last_modified: Optional[str],
+                 expires_at: float, charset: Optional[str] = None):
+        self.url = url
+        self.body = body
+        # Кодировка, определённая при загрузке (None — записи до её сохранения)
+        self.charset = charset
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+
+    @property
+    def is_fresh(self) -> bool:
+        """Можно отдать без обращения к сайту"""
+        return self.expires_at > time.time()
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Заголовки для перепроверки устаревшей копии (304 — копия актуальна)"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class PageCache:
+    def __init__(self, db_path: str = None, ttl: float = 24 * 60 * 60,
+                 max_size: int = 512 * 1024 * 1024, compression_level: int = 6):
+        """
+        Инициализация кеша
+
+        Args:
+            db_path: Путь к SQLite базе (общая для всех воркеров на узле)
+            ttl: Сколько секунд копия считается свежей и отдаётся без запроса к сайту
+            max_size: Максимальный суммарный размер сжатых страниц в байтах (вытеснение по LRU)
+            compression_level: Уровень сжатия zlib
+        """
+        self.db_path = db_path or os.path.join(CACHE_DIR, "page_cache.sqlite3")
+        self.ttl = ttl
+        self.max_size = max_size
+        self.compression_level = compression_level
+
+        self._lock = threading.Lock()
+        self.stats = {
+            "fresh_hits": 0,
+            "revalidated": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0
+        }
+
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._connection = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS pages "
+            "(url TEXT PRIMARY KEY, body BLOB NOT NULL, size INTEGER NOT NULL, etag TEXT, "
+            "last_modified TEXT, expires_at REAL NOT NULL, accessed_at REAL NOT NULL, charset TEXT)"
+        )
+        try:
+            # Базы, созданные до сохранения кодировки
+            self._connection.execute("ALTER TABLE pages ADD COLUMN charset TEXT")
+        except sqlite3.OperationalError:
+            pass
+        self._connection.execute("CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages (accessed_at)")
+        self._connection.commit()
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        """Копия страницы (в том числе устаревшая — для условного запроса) или None"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT body, etag, last_modified, expires_at, charset FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+
+            self._connection.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (time.time(), url))
+            self._connection.commit()
+
+        page = CachedPage(url, zlib.decompress(row[0]), row[1], row[2], row[3], row[4])
+        if page.is_fresh:
+            with self._lock:
+                self.stats["fresh_hits"] += 1
+        return page
+
+    def store(self, url: str, body: bytes, etag: Optional[str] = None,
+              last_modified: Optional[str] = None, charset: Optional[str] = None) -> None:
+        """Сохранить страницу и вытеснить давно не использованные, если кеш переполнен"""
+        compressed = zlib.compress(body, self.compression_level)
+        if len(compressed) > self.max_size:
+            return
+
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO pages "
+                "(url, body, size, etag, last_modified, expires_at, accessed_at, charset) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, compressed, len(compressed), etag, last_modified, now + self.ttl, now, charset)
+            )
+            self._evict()
+            self._connection.commit()
+            self.stats["stores"] += 1
+
+    def revalidate(self, url: str) -> None:
+        """Сайт ответил 304: продлить свежесть копии"""
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "UPDATE pages SET expires_at = ?, accessed_at = ? WHERE url = ?",
+                (now + self.ttl, now, url)
+            )
+            self._connection.commit()
+            self.stats["revalidated"] += 1
+
+    def _evict(self) -> None:
+        """Удалять самые давно использованные страницы, пока кеш больше лимита (под блокировкой)"""
+        total_size = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total_size <= self.max_size:
+            return
+
+        for url, size in self._connection.execute(
+            "SELECT url, size FROM pages ORDER BY accessed_at"
+        ).fetchall():
+            self._connection.execute("DELETE FROM pages WHERE url = ?", (url,))
+            self.stats["evictions"] += 1
+            total_size -= size
+            if total_size <= self.max_size:
+                break
+
+    def get_stats(self) -> Dict:
+        """Счётчики текущего процесса и размер кеша на диске"""
+        with self._lock:
+            entries, total_size = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages"
+            ).fetchone()
+            return {
+                **self.stats,
+                "entries": entries,
+                "size_bytes": total_size
+            }
+
+
+_page_cache = None
+
+
+def get_page_cache() -> PageCache:
+    """Общий для процесса экземпляр (настраивается через PAGE_CACHE_TTL и PAGE_CACHE_MAX_MB)"""
+    global _page_cache
+    if _page_cache is None:
+        _page_cache = PageCache(
+            ttl=float(os.getenv("PAGE_CACHE_TTL", 24 * 60 * 60)),
+            max_size=int(float(os.getenv("PAGE_CACHE_MAX_MB", 512)) * 1024 * 1024)
+        )
+    return _page_cache
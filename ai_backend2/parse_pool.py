@@ -0,0 +1,26 @@
+"""
+Пул процессов для CPU-тяжёлой обработки страниц (разбор HTML, очистка, чанки)
+"""
+
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from fastapi import Request
+
+
+# Число процессов обработки на воркер API (0 — обработка в потоке без пула)
+DEFAULT_PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", min(os.cpu_count() or 1, 4)))
+
+
+def create_parse_pool(workers: int = DEFAULT_PARSE_WORKERS) -> Optional[ProcessPoolExecutor]:
+    """Создать пул (вызывается при старте приложения)"""
+    if workers <= 0:
+        return None
+    # spawn, а не fork: процесс API уже держит потоки, соединения SQLite и пулы HTTP
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def get_parse_pool(request: Request) -> Optional[ProcessPoolExecutor]:
+    """Зависимость FastAPI: пул процессов, созданный при старте приложения"""
+    return request.app.state.parse_pool
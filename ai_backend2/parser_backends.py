@@ -0,0 +1,706 @@
+"""
+Бэкенды разбора HTML для извлечения заголовка, описания и основного контента статьи
+"""
+
+import os
+import re
+import json
+from html import unescape
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+from bs4 import BeautifulSoup, Tag, NavigableString, CData
+from html_head import extract_head_meta, head_section
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None  # selectolax не установлен — быстрый бэкенд недоступен
+
+
+TITLE_NOT_FOUND = "Заголовок не найден"
+
+# Теги, которые удаляются целиком
+REMOVED_TAGS = ['script', 'style', 'nav', 'header', 'footer',
+                'aside', 'advertisement', 'ads', 'sidebar']
+
+# Удаляем элементы по классам и ID (типичный мусор)
+UNWANTED_SELECTORS = [
+    '[class*="nav"]', '[class*="menu"]', '[class*="header"]',
+    '[class*="footer"]', '[class*="sidebar"]', '[class*="widget"]',
+    '[class*="ad"]', '[class*="banner"]', '[class*="popup"]',
+    '[id*="nav"]', '[id*="menu"]', '[id*="header"]',
+    '[id*="footer"]', '[id*="sidebar"]'
+]
+
+# Популярные селекторы основного контента (в порядке приоритета)
+CONTENT_SELECTORS = [
+    'article', '[role="main"]', 'main', '.content', '.post-content',
+    '.entry-content', '.article-content', '.post-body', '.text',
+    '.post', '.blog-post', '.article', '.story', '.news-content',
+    '.page-content', '.main-content', '.content-area', '.entry',
+    '.post-text', '.article-text', '.content-text', '.text-content',
+    '#content', '#main', '.main-content'
+]
+
+# Если не нашли по селекторам, ищем по тегам
+FALLBACK_TAGS = ['article', 'main', 'div']
+
+# Блочные теги: текст статьи собирается по фрагментам внутри самого глубокого из них
+# (строчные span, a, b и т.п. не разрывают фрагмент)
+BLOCK_TAGS = frozenset([
+    'p', 'div', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li', 'ul', 'ol', 'dl', 'dt', 'dd',
+    'article', 'main', 'section', 'blockquote', 'pre', 'figure', 'figcaption',
+    'table', 'thead', 'tbody', 'tfoot', 'tr', 'td', 'th', 'caption', 'address', 'form', 'fieldset'
+])
+# Поддеревья, текст которых не относится к статье
+SKIPPED_TEXT_TAGS = frozenset(['head', 'template', 'noscript'])
+MIN_TEXT_PART_LENGTH = 20
+MIN_CONTENT_LENGTH = 150
+
+# Как найден основной контент: из структурированных данных страницы, по сохранённому шаблону домена
+# или полным перебором эвристик
+EXTRACTION_PATH_STRUCTURED = "structured_data"
+EXTRACTION_PATH_TEMPLATE = "template"
+EXTRACTION_PATH_HEURISTICS = "heuristics"
+
+# articleBody короче этого считаем анонсом и разбираем страницу целиком
+MIN_STRUCTURED_BODY_LENGTH = 500
+
+# Типы schema.org семейства Article, чей articleBody — текст статьи (Comment, Review, форумные посты и т.п. не берём)
+ARTICLE_TYPES = frozenset({
+    "article", "newsarticle", "blogposting", "liveblogposting", "reportagenewsarticle", "analysisnewsarticle",
+    "opinionnewsarticle", "reviewnewsarticle", "backgroundnewsarticle", "askpublicnewsarticle",
+    "satiricalarticle", "scholarlyarticle", "medicalscholarlyarticle", "techarticle", "report",
+    "advertisercontentarticle"
+})
+
+_JSON_LD_RE = re.compile(
+    r'<script\b[^>]*\btype\s*=\s*["\']?application/ld\+json["\']?[^>]*>(.*?)</script\s*>', re.I | re.S
+)
+_TAG_RE = re.compile(r'<[^>]+>')
+
+
+def _compile_attribute_rules(selectors: List[str]) -> Dict[str, "re.Pattern"]:
+    """[attr*="value"] → регулярное выражение на атрибут (одна проверка вместо прохода на каждый селектор)"""
+    substrings = {}
+    for selector in selectors:
+        match = re.fullmatch(r'\[(\w+)\*="([^"]+)"\]', selector)
+        substrings.setdefault(match.group(1), []).append(re.escape(match.group(2)))
+    return {attribute: re.compile("|".join(values)) for attribute, values in substrings.items()}
+
+
+def _compile_content_rules(selectors: List[str]) -> Dict[str, Dict]:
+    """
+    Простые CSS-селекторы (tag, .class, #id, [attr="value"]) → индексы по тегу, классу, id и атрибуту,
+    чтобы проверка элемента не перебирала все селекторы
+    """
+    rules = {"tag": {}, "class": {}, "id": {}, "attribute": {}}
+    for index, selector in enumerate(selectors):
+        attribute_match = re.fullmatch(r'\[(\w+)="([^"]*)"\]', selector)
+        if selector.startswith('.'):
+            rules["class"].setdefault(selector[1:], []).append(index)
+        elif selector.startswith('#'):
+            rules["id"].setdefault(selector[1:], []).append(index)
+        elif attribute_match:
+            key = (attribute_match.group(1), attribute_match.group(2))
+            rules["attribute"].setdefault(key, []).append(index)
+        else:
+            rules["tag"].setdefault(selector, []).append(index)
+    return rules
+
+
+_REMOVED_TAG_SET = frozenset(REMOVED_TAGS)
+_UNWANTED_ATTRIBUTE_RULES = _compile_attribute_rules(UNWANTED_SELECTORS)
+_CONTENT_RULES = _compile_content_rules(CONTENT_SELECTORS)
+_FALLBACK_RULES = _compile_content_rules(FALLBACK_TAGS)
+
+
+# Строки, которые учитывает get_text() обычного тега (без комментариев, скриптов и т.п.)
+_TEXT_STRING_TYPES = (NavigableString, CData)
+
+
+class NodeStats:
+    """Статистика поддерева: длина текста, длина текста внутри ссылок и число тегов"""
+
+    __slots__ = ("text_length", "link_text_length", "tag_count")
+
+    def __init__(self, text_length: int = 0, link_text_length: int = 0, tag_count: int = 1):
+        self.text_length = text_length
+        self.link_text_length = link_text_length
+        self.tag_count = tag_count
+
+    @property
+    def score(self) -> float:
+        """Текст без ссылок: меню и списки ссылок не перевешивают статью"""
+        return self.text_length - self.link_text_length
+
+    def selection_key(self) -> Tuple[float, int]:
+        """Больше текста без ссылок, при равенстве — плотнее (меньше тегов)"""
+        return self.score, -self.tag_count
+
+
+def _clean_text(text: str) -> str:
+    """Очистка текста от лишних символов и форматирование"""
+    if not text:
+        return ""
+
+    # Удаляем лишние пробелы и переносы строк
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\n\s*\n', '\n\n', text)
+
+    # Удаляем HTML entities
+    text = text.replace('&nbsp;', ' ')
+    text = text.replace('&quot;', '"')
+    text = text.replace('&lt;', '<')
+    text = text.replace('&gt;', '>')
+    text = text.replace('&amp;', '&')
+
+    return text.strip()
+
+
+class _TextRuns:
+    """Фрагменты текста: каждый попадает в результат один раз — из самого глубокого блока"""
+
+    def __init__(self):
+        self.parts = []
+        self._buffer = []
+
+    def add(self, text: str) -> None:
+        self._buffer.append(text)
+
+    def close(self) -> None:
+        """Граница блока: текущий фрагмент закончен"""
+        if not self._buffer:
+            return
+        text = ''.join(self._buffer).strip()
+        self._buffer = []
+        if len(text) > MIN_TEXT_PART_LENGTH:
+            self.parts.append(text)
+
+
+# Маркер выхода из блочного элемента при обходе со стеком
+_BLOCK_END = object()
+
+# id и классы с длинными числами (post-12345) меняются от страницы к странице — в шаблон не попадают
+_UNSTABLE_TOKEN_RE = re.compile(r'\d{3,}')
+
+
+def _template_signature(tag: str, element_id: Optional[str], classes: List[str]) -> List:
+    """Шаг пути шаблона: тег, устойчивый id и устойчивые классы"""
+    if element_id and _UNSTABLE_TOKEN_RE.search(element_id):
+        element_id = None
+    stable_classes = sorted(set(c for c in classes if not _UNSTABLE_TOKEN_RE.search(c)))
+    return [tag, element_id or None, stable_classes]
+
+
+def _template_content(content_parts: List[str]) -> Optional[str]:
+    """Текст по шаблону, если его достаточно (иначе шаблон не подошёл и нужны эвристики)"""
+    if len(' '.join(content_parts)) < MIN_CONTENT_LENGTH:
+        return None
+    return _clean_text('\n\n'.join(content_parts))
+
+
+def _join_content_parts(content_parts: List[str], fallback_text: str) -> str:
+    """Склеить найденные фрагменты (если их мало — весь текст контейнера)"""
+    if len(' '.join(content_parts)) < MIN_CONTENT_LENGTH:
+        content_parts = [fallback_text]
+
+    return _clean_text('\n\n'.join(content_parts))
+
+
+def _is_article_type(value) -> bool:
+    """@type (строка или список) из семейства Article; "schema:NewsArticle" и полные URL типов тоже подходят"""
+    types = value if isinstance(value, list) else [value]
+    return any(
+        isinstance(name, str) and re.split(r'[/:#]', name)[-1].lower() in ARTICLE_TYPES
+        for name in types
+    )
+
+
+def _article_objects(data) -> Iterator[Dict]:
+    """Статьи JSON-LD с текстом (в том числе внутри @graph и списков)"""
+    stack = [data]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, list):
+            stack.extend(item)
+        elif isinstance(item, dict):
+            if isinstance(item.get("articleBody"), str) and _is_article_type(item.get("@type")):
+                yield item
+            stack.extend(value for value in item.values() if isinstance(value, (dict, list)))
+
+
+def _page_key(url: str) -> Tuple[str, str, str]:
+    """Адрес для сравнения: хост без www., путь без завершающего слеша и query (схема не важна)"""
+    parsed = urlparse(url.strip())
+    host = parsed.netloc.lower()
+    return (host[4:] if host.startswith("www.") else host), parsed.path.rstrip("/"), parsed.query
+
+
+def _describes_page(item: Dict, page: Tuple[str, str, str]) -> bool:
+    """Статья JSON-LD относится к этой странице (mainEntityOfPage, url или @id указывают на её адрес)"""
+    references = [item.get("url"), item.get("@id")]
+    main_entity = item.get("mainEntityOfPage")
+    if isinstance(main_entity, dict):
+        references.extend([main_entity.get("@id"), main_entity.get("url")])
+    else:
+        references.append(main_entity)
+    return any(isinstance(reference, str) and _page_key(reference) == page for reference in references)
+
+
+def _json_text(value) -> str:
+    return value.strip() if isinstance(value, str) else ""
+
+
+def extract_structured_data(html: str, url: str = "") -> Optional[Dict]:
+    """
+    Быстрый путь: текст статьи из JSON-LD (articleBody) без построения DOM
+
+    Берётся статья, которая ссылается на эту страницу (mainEntityOfPage / url / @id), а если такой нет —
+    самая длинная. Заголовок и описание — из <head> (как при разборе DOM), при их отсутствии — из JSON-LD
+    и OpenGraph. None — на странице нет articleBody достаточной длины.
+    """
+    page = _page_key(url)
+    candidates = []
+    for match in _JSON_LD_RE.finditer(html):
+        try:
+            data = json.loads(match.group(1), strict=False)
+        except ValueError:
+            continue
+        candidates.extend(_article_objects(data))
+
+    # Связанные статьи и ItemList тоже бывают с articleBody — статья этой страницы важнее длины
+    own = [item for item in candidates if _describes_page(item, page)] if url else []
+    article = max(own or candidates, key=lambda item: len(item["articleBody"]), default=None)
+    if article is None:
+        return None
+
+    # articleBody иногда публикуют с HTML-разметкой и сущностями
+    content = _clean_text(_TAG_RE.sub(' ', unescape(article["articleBody"])))
+    if len(content) < MIN_STRUCTURED_BODY_LENGTH:
+        return None
+
+    head = extract_head_meta(head_section(html))
+
+    return {
+        "title": head.title or _json_text(article.get("headline")) or head.og_title or TITLE_NOT_FOUND,
+        "meta_description": head.description or _json_text(article.get("description")) or head.og_description,
+        "content": content,
+        "extraction_path": EXTRACTION_PATH_STRUCTURED,
+        "template": None
+    }
+
+
+class ParserBackend:
+    """
+    Бэкенд разбора: HTML → {"title", "meta_description", "content", "extraction_path", "template"}
+
+    template — путь от корня документа к контейнеру статьи: [[тег, id, классы], ...], где каждый шаг
+    однозначен среди соседей. Путь, найденный эвристиками, запоминается для домена и передаётся
+    при разборе следующих его страниц (None — путь неоднозначен, запоминать нечего).
+    """
+
+    name = ""
+
+    def extract(self, html: str, url: str, template: Optional[List] = None) -> Dict:
+        """Статья из структурированных данных, а если их нет — разбором DOM"""
+        structured = extract_structured_data(html, url)
+        if structured is not None:
+            return structured
+        return self._extract_dom(html, url, template)
+
+    def _extract_dom(self, html: str, url: str, template: Optional[List] = None) -> Dict:
+        raise NotImplementedError
+
+
+class BeautifulSoupBackend(ParserBackend):
+    def __init__(self, features: str = "html.parser"):
+        """
+        Args:
+            features: Построитель дерева BeautifulSoup ("html.parser" или "lxml")
+        """
+        self.features = features
+        self.name = features
+
+    @staticmethod
+    def _is_unwanted(element: Tag) -> bool:
+        """Элемент-мусор: по тегу или по подстроке в class/id"""
+        if element.name in _REMOVED_TAG_SET:
+            return True
+
+        for attribute, pattern in _UNWANTED_ATTRIBUTE_RULES.items():
+            value = element.attrs.get(attribute)
+            if value is None:
+                continue
+            # class многозначный: как и CSS-селектор, проверяем значения, склеенные через пробел
+            if isinstance(value, list):
+                value = " ".join(value)
+            if pattern.search(value):
+                return True
+        return False
+
+    @staticmethod
+    def _matching_rules(element: Tag, rules: Dict[str, Dict]) -> List[int]:
+        """Номера селекторов, которым соответствует элемент"""
+        indexes = list(rules["tag"].get(element.name, ()))
+
+        for class_name in element.attrs.get("class", ()):
+            indexes.extend(rules["class"].get(class_name, ()))
+
+        element_id = element.attrs.get("id")
+        if element_id is not None:
+            indexes.extend(rules["id"].get(element_id, ()))
+
+        for (attribute, value), attribute_indexes in rules["attribute"].items():
+            if element.attrs.get(attribute) == value:
+                indexes.extend(attribute_indexes)
+
+        return indexes
+
+    def _prune_and_collect(self, soup: BeautifulSoup) -> Tuple[List[Tag], List[List[Tag]], List[List[Tag]]]:
+        """
+        Один обход дерева: удаляет мусор и собирает кандидатов в основной контент
+
+        Returns:
+            (оставшиеся элементы в порядке документа,
+             кандидаты по каждому из CONTENT_SELECTORS, кандидаты по каждому из FALLBACK_TAGS)
+        """
+        elements = []
+        content_candidates = [[] for _ in CONTENT_SELECTORS]
+        fallback_candidates = [[] for _ in FALLBACK_TAGS]
+
+        # Прямой обход в порядке документа; у удалённого элемента потомков не смотрим
+        stack = [child for child in reversed(soup.contents) if isinstance(child, Tag)]
+        while stack:
+            element = stack.pop()
+
+            if self._is_unwanted(element):
+                element.decompose()
+                continue
+
+            elements.append(element)
+            # set: элемент с повторяющимся классом не должен попасть в кандидаты дважды
+            for index in set(self._matching_rules(element, _CONTENT_RULES)):
+                content_candidates[index].append(element)
+            for index in set(self._matching_rules(element, _FALLBACK_RULES)):
+                fallback_candidates[index].append(element)
+
+            stack.extend(child for child in reversed(element.contents) if isinstance(child, Tag))
+
+        return elements, content_candidates, fallback_candidates
+
+    @staticmethod
+    def _compute_stats(elements: List[Tag]) -> Dict[int, NodeStats]:
+        """
+        Статистика всех элементов одним проходом снизу вверх (O(n) вместо get_text() на каждого кандидата)
+
+        Args:
+            elements: Элементы в порядке документа — в обратном порядке потомки идут раньше предков
+        """
+        stats = {}
+        for element in reversed(elements):
+            node = NodeStats()
+            for child in element.contents:
+                if isinstance(child, Tag):
+                    child_stats = stats[id(child)]
+                    node.text_length += child_stats.text_length
+                    node.link_text_length += child_stats.link_text_length
+                    node.tag_count += child_stats.tag_count
+                elif type(child) in _TEXT_STRING_TYPES:
+                    node.text_length += len(child)
+
+            if element.name == 'a':
+                node.link_text_length = node.text_length
+            stats[id(element)] = node
+        return stats
+
+    def _signature(self, element: Tag) -> List:
+        return _template_signature(element.name, element.attrs.get("id"), element.attrs.get("class", []))
+
+    def _follow_template(self, soup: BeautifulSoup, template: List) -> Optional[Tag]:
+        """Элемент по пути шаблона; мусорные элементы пропускаются, как если бы уже были удалены"""
+        element = soup
+        for signature in template:
+            matches = [
+                child for child in element.contents
+                if isinstance(child, Tag) and child.name == signature[0]
+                and self._signature(child) == signature and not self._is_unwanted(child)
+            ]
+            if len(matches) != 1:
+                return None
+            element = matches[0]
+        return element
+
+    def _template_path(self, element: Tag) -> Optional[List]:
+        """Путь шаблона к элементу (дерево уже очищено от мусора); None — на каком-то шаге есть двойники"""
+        path = []
+        while not isinstance(element, BeautifulSoup):
+            signature = self._signature(element)
+            for sibling in element.parent.contents:
+                if (isinstance(sibling, Tag) and sibling is not element and sibling.name == element.name
+                        and self._signature(sibling) == signature):
+                    return None
+            path.append(signature)
+            element = element.parent
+        return path[::-1]
+
+    def _prune(self, root: Tag) -> None:
+        """Удалить мусор внутри элемента (без сбора кандидатов)"""
+        stack = [child for child in root.contents if isinstance(child, Tag)]
+        while stack:
+            element = stack.pop()
+            if self._is_unwanted(element):
+                element.decompose()
+            else:
+                stack.extend(child for child in element.contents if isinstance(child, Tag))
+
+    def _extract_main_content(self, soup: BeautifulSoup, url: str,
+                              template: Optional[List] = None) -> Tuple[str, str, Optional[List]]:
+        """
+        Извлечение основного контента из HTML
+
+        Returns:
+            (текст, способ извлечения, путь шаблона к контейнеру или None)
+        """
+        # Известный домен: сразу к контейнеру, мусор убираем только внутри него
+        if template:
+            main_content = self._follow_template(soup, template)
+            if main_content is not None:
+                self._prune(main_content)
+                content = _template_content(self._collect_text_runs(main_content))
+                if content is not None:
+                    return content, EXTRACTION_PATH_TEMPLATE, template
+
+        elements, content_candidates, fallback_candidates = self._prune_and_collect(soup)
+        stats = self._compute_stats(elements)
+
+        # Первый по приоритету селектор (затем тег), у которого есть совпадения;
+        # из них выбираем элемент с наибольшим количеством текста вне ссылок
+        main_content = None
+        for candidates in content_candidates + fallback_candidates:
+            if candidates:
+                main_content = max(candidates, key=lambda x: stats[id(x)].selection_key())
+                break
+
+        if not main_content:
+            main_content = soup
+
+        content = _join_content_parts(self._collect_text_runs(main_content), main_content.get_text())
+        template_path = self._template_path(main_content) if main_content is not soup else None
+        return content, EXTRACTION_PATH_HEURISTICS, template_path
+
+    @staticmethod
+    def _collect_text_runs(main_content: Tag) -> List[str]:
+        """Фрагменты текста в порядке документа, без повторов вложенных блоков"""
+        runs = _TextRuns()
+        stack = list(reversed(main_content.contents))
+        while stack:
+            item = stack.pop()
+            if item is _BLOCK_END:
+                runs.close()
+            elif isinstance(item, Tag):
+                if item.name in SKIPPED_TEXT_TAGS:
+                    continue
+                if item.name in BLOCK_TAGS:
+                    runs.close()
+                    stack.append(_BLOCK_END)
+                stack.extend(reversed(item.contents))
+            elif type(item) in _TEXT_STRING_TYPES:
+                runs.add(item)
+
+        runs.close()
+        return runs.parts
+
+    def _extract_dom(self, html: str, url: str, template: Optional[List] = None) -> Dict:
+        soup = BeautifulSoup(html, self.features)
+
+        # Извлекаем title
+        title_tag = soup.find('title')
+        title = title_tag.get_text().strip() if title_tag else TITLE_NOT_FOUND
+
+        # Извлекаем meta description
+        meta_desc_tag = soup.find('meta', attrs={'name': 'description'})
+        meta_description = ""
+        if meta_desc_tag and meta_desc_tag.get('content'):
+            meta_description = meta_desc_tag['content'].strip()
+
+        content, extraction_path, template_path = self._extract_main_content(soup, url, template)
+        return {
+            "title": title,
+            "meta_description": meta_description,
+            "content": content,
+            "extraction_path": extraction_path,
+            "template": template_path
+        }
+
+
+class SelectolaxBackend(ParserBackend):
+    """Тот же алгоритм поверх C-парсера lexbor (selectolax)"""
+
+    name = "selectolax"
+
+    def _remove_matches(self, tree, selector: str) -> None:
+        """Удалить найденные узлы (вложенные в уже удаляемые пропускаем — их удалит предок)"""
+        matches = tree.css(selector)
+        removed = set()
+        for node in matches:
+            ancestor = node.parent
+            while ancestor is not None and ancestor.mem_id not in removed:
+                ancestor = ancestor.parent
+            if ancestor is None:
+                removed.add(node.mem_id)
+
+        for node in matches:
+            if node.mem_id in removed:
+                node.decompose()
+
+    @staticmethod
+    def _compute_stats(root) -> Dict[int, NodeStats]:
+        """Статистика всех узлов одним проходом снизу вверх (как у BeautifulSoupBackend, ключ — mem_id узла)"""
+        elements = []
+        children = {}
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            elements.append(node)
+            node_children = list(node.iter(include_text=True))
+            children[node.mem_id] = node_children
+            stack.extend(child for child in node_children if child.is_element_node)
+
+        # Потомки добавлены в список позже предков — в обратном порядке их статистика уже посчитана
+        stats = {}
+        for element in reversed(elements):
+            node = NodeStats()
+            for child in children[element.mem_id]:
+                if child.is_element_node:
+                    child_stats = stats[child.mem_id]
+                    node.text_length += child_stats.text_length
+                    node.link_text_length += child_stats.link_text_length
+                    node.tag_count += child_stats.tag_count
+                elif child.is_text_node:
+                    node.text_length += len(child.text_content)
+
+            if element.tag == 'a':
+                node.link_text_length = node.text_length
+            stats[element.mem_id] = node
+        return stats
+
+    @staticmethod
+    def _signature(node) -> List:
+        return _template_signature(node.tag, node.attributes.get("id"), (node.attributes.get("class") or "").split())
+
+    def _follow_template(self, tree, template: List):
+        """Узел по пути шаблона (мусор к этому моменту уже удалён)"""
+        if tree.root is None:
+            return None
+        node = tree.root.parent
+        for signature in template:
+            matches = [child for child in node.iter()
+                       if child.tag == signature[0] and self._signature(child) == signature]
+            if len(matches) != 1:
+                return None
+            node = matches[0]
+        return node
+
+    def _template_path(self, node) -> Optional[List]:
+        """Путь шаблона к узлу от корня документа; None — на каком-то шаге есть двойники"""
+        path = []
+        while node.parent is not None:
+            signature = self._signature(node)
+            for sibling in node.parent.iter():
+                if (sibling.mem_id != node.mem_id and sibling.tag == node.tag
+                        and self._signature(sibling) == signature):
+                    return None
+            path.append(signature)
+            node = node.parent
+        return path[::-1]
+
+    def _extract_main_content(self, tree, url: str, template: Optional[List] = None) -> Tuple[str, str, Optional[List]]:
+        """Извлечение основного контента из HTML: (текст, способ извлечения, путь шаблона или None)"""
+        self._remove_matches(tree, ", ".join(REMOVED_TAGS))
+        self._remove_matches(tree, ", ".join(UNWANTED_SELECTORS))
+
+        # Известный домен: сразу к контейнеру без перебора селекторов
+        if template:
+            main_content = self._follow_template(tree, template)
+            if main_content is not None:
+                content = _template_content(self._collect_text_runs(main_content))
+                if content is not None:
+                    return content, EXTRACTION_PATH_TEMPLATE, template
+
+        main_content = None
+        stats = self._compute_stats(tree.root) if tree.root is not None else {}
+        for selector in CONTENT_SELECTORS + FALLBACK_TAGS:
+            elements = tree.css(selector)
+            if elements:
+                main_content = max(elements, key=lambda x: stats[x.mem_id].selection_key())
+                break
+
+        if main_content is None:
+            main_content = tree.root
+
+        content = _join_content_parts(self._collect_text_runs(main_content), main_content.text())
+        template_path = self._template_path(main_content) if main_content.tag != 'html' else None
+        return content, EXTRACTION_PATH_HEURISTICS, template_path
+
+    @staticmethod
+    def _collect_text_runs(main_content) -> List[str]:
+        """Фрагменты текста в порядке документа, без повторов вложенных блоков"""
+        runs = _TextRuns()
+        stack = list(main_content.iter(include_text=True))[::-1]
+        while stack:
+            node = stack.pop()
+            if node is _BLOCK_END:
+                runs.close()
+            elif node.is_text_node:
+                runs.add(node.text_content)
+            elif node.is_element_node and node.tag not in SKIPPED_TEXT_TAGS:
+                if node.tag in BLOCK_TAGS:
+                    runs.close()
+                    stack.append(_BLOCK_END)
+                stack.extend(list(node.iter(include_text=True))[::-1])
+
+        runs.close()
+        return runs.parts
+
+    def _extract_dom(self, html: str, url: str, template: Optional[List] = None) -> Dict:
+        tree = LexborHTMLParser(html)
+
+        title_tag = tree.css_first('title')
+        title = title_tag.text().strip() if title_tag else TITLE_NOT_FOUND
+
+        meta_desc_tag = tree.css_first('meta[name="description"]')
+        meta_description = ""
+        if meta_desc_tag and meta_desc_tag.attributes.get('content'):
+            meta_description = meta_desc_tag.attributes['content'].strip()
+
+        content, extraction_path, template_path = self._extract_main_content(tree, url, template)
+        return {
+            "title": title,
+            "meta_description": meta_description,
+            "content": content,
+            "extraction_path": extraction_path,
+            "template": template_path
+        }
+
+
+PARSER_BACKENDS = {
+    "html.parser": lambda: BeautifulSoupBackend("html.parser"),
+    "lxml": lambda: BeautifulSoupBackend("lxml"),
+    "selectolax": SelectolaxBackend
+}
+
+DEFAULT_PARSER_BACKEND = os.getenv("HTML_PARSER_BACKEND", "html.parser")
+
+
+def available_backends() -> List[str]:
+    """Бэкенды, которые можно использовать в текущем окружении"""
+    return [name for name in PARSER_BACKENDS if name != "selectolax" or LexborHTMLParser is not None]
+
+
+def get_parser_backend(name: str = None) -> ParserBackend:
+    """Бэкенд по имени (по умолчанию — из HTML_PARSER_BACKEND)"""
+    name = name or DEFAULT_PARSER_BACKEND
+    if name not in available_backends():
+        raise ValueError(f"Бэкенд разбора HTML недоступен: {name} (доступны: {', '.join(available_backends())})")
+    return PARSER_BACKENDS[name]()
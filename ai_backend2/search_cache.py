@@ -0,0 +1,162 @@
+"""
+Двухуровневый кеш результатов Yandex поиска: LRU в памяти + SQLite на диске
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Optional
+
+
+CACHE_DIR = os.getenv(
+    "SEO_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+)
+
+
+class SearchCache:
+    def __init__(self, db_path: str = None, ttl: float = 6 * 60 * 60, memory_size: int = 256,
+                 negative_ttl: float = 60 * 60):
+        """
+        Инициализация кеша
+
+        Args:
+            db_path: Путь к SQLite базе (общая для всех воркеров на узле)
+            ttl: Время жизни результатов поиска в секундах
+            memory_size: Размер LRU-кеша в памяти процесса (в запросах)
+            negative_ttl: Время, на которое запоминается недоступный для дозагрузки URL
+        """
+        self.db_path = db_path or os.path.join(CACHE_DIR, "search_cache.sqlite3")
+        self.ttl = ttl
+        self.memory_size = memory_size
+        self.negative_ttl = negative_ttl
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "negative_hits": 0,
+            "negative_stores": 0
+        }
+
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._connection = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+        # WAL позволяет нескольким uvicorn-воркерам читать и писать одну базу
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS search_results "
+            "(key TEXT PRIMARY KEY, payload TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS failed_urls "
+            "(url TEXT PRIMARY KEY, expires_at REAL NOT NULL)"
+        )
+        self._connection.commit()
+
+    @staticmethod
+    def make_key(query: str, region: int, page_size: int) -> str:
+        """Ключ кеша по нормализованному запросу, региону и размеру выдачи"""
+        normalized_query = " ".join(query.lower().split())
+        return f"{normalized_query}|{region}|{page_size}"
+
+    def _remember(self, key: str, results: List[Dict], expires_at: float) -> None:
+        """Положить значение в LRU в памяти (вызывается под блокировкой)"""
+        self._memory[key] = (expires_at, results)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        """Получить результаты из памяти или с диска (None — промах)"""
+        now = time.time()
+
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached and cached[0] > now:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return cached[1]
+
+            row = self._connection.execute(
+                "SELECT payload, expires_at FROM search_results WHERE key = ? AND expires_at > ?",
+                (key, now)
+            ).fetchone()
+
+            if row is None:
+                self._memory.pop(key, None)
+                self.stats["misses"] += 1
+                return None
+
+            results = json.loads(row[0])
+            self._remember(key, results, row[1])
+            self.stats["disk_hits"] += 1
+            return results
+
+    def set(self, key: str, results: List[Dict]) -> None:
+        """Сохранить результаты в оба уровня кеша"""
+        now = time.time()
+        expires_at = now + self.ttl
+
+        with self._lock:
+            self._remember(key, results, expires_at)
+            self._connection.execute(
+                "INSERT OR REPLACE INTO search_results (key, payload, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(results, ensure_ascii=False), expires_at)
+            )
+            self._writes += 1
+            # Периодически вычищаем просроченные записи, чтобы база не разрасталась
+            if self._writes % 100 == 0:
+                self._connection.execute("DELETE FROM search_results WHERE expires_at <= ?", (now,))
+                self._connection.execute("DELETE FROM failed_urls WHERE expires_at <= ?", (now,))
+            self._connection.commit()
+            self.stats["stores"] += 1
+
+    def is_failed_url(self, url: str) -> bool:
+        """Был ли URL недавно недоступен для дозагрузки title/description"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT 1 FROM failed_urls WHERE url = ? AND expires_at > ?",
+                (url, time.time())
+            ).fetchone()
+            if row:
+                self.stats["negative_hits"] += 1
+            return row is not None
+
+    def mark_failed_url(self, url: str) -> None:
+        """Запомнить URL, дозагрузка которого не удалась"""
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO failed_urls (url, expires_at) VALUES (?, ?)",
+                (url, time.time() + self.negative_ttl)
+            )
+            self._connection.commit()
+            self.stats["negative_stores"] += 1
+
+    def get_stats(self) -> Dict:
+        """Счётчики попаданий и промахов текущего процесса"""
+        with self._lock:
+            lookups = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+            hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+            return {
+                **self.stats,
+                "memory_entries": len(self._memory),
+                "hit_rate": round(hits / lookups * 100, 2) if lookups else 0.0
+            }
+
+
+_search_cache = None
+
+
+def get_search_cache() -> SearchCache:
+    """Общий для процесса экземпляр кеша (TTL настраивается через SEARCH_CACHE_TTL)"""
+    global _search_cache
+    if _search_cache is None:
+        _search_cache = SearchCache(ttl=float(os.getenv("SEARCH_CACHE_TTL", 6 * 60 * 60)))
+    return _search_cache
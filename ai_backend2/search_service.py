@@ -2,12 +2,37 @@
 Сервис для поиска через Yandex Search API
 """
 
-import requests
+import os
+import asyncio
+import httpx
+import io
 import base64
 import xml.etree.ElementTree as ET
-from bs4 import BeautifulSoup
-from typing import List, Dict, Optional, Tuple
-from yandex_auth import YandexAuthService
+from contextlib import asynccontextmanager
+from typing import List, Dict, Optional, Tuple, Union, AsyncIterator, Iterator
+from yandex_auth import YandexAuthService, get_auth_service
+from search_cache import SearchCache, get_search_cache
+from html_head import (
+    HEAD_END_MARKER, DEFAULT_HEAD_BYTES_LIMIT, find_head_end, detect_charset,
+    decode_html, extract_head_meta
+)
+
+
+SEARCH_ASYNC_URL = "https://searchapi.api.cloud.yandex.net/v2/web/searchAsync"
+OPERATION_URL = "https://operation.api.cloud.yandex.net/operations/{operation_id}"
+
+TITLE_PLACEHOLDER = "Заголовок не получен, смотрите на странице"
+DESCRIPTION_PLACEHOLDER = "Описание не получено, смотрите на странице"
+MIN_TITLE_LENGTH = 10
+MIN_SNIPPET_LENGTH = 40
+
+# Дозагрузка title/description слабых результатов: параллельность и общий дедлайн этапа (в секундах)
+DEFAULT_ENRICHMENT_WORKERS = int(os.getenv("SEARCH_ENRICH_WORKERS", 5))
+DEFAULT_ENRICHMENT_DEADLINE = float(os.getenv("SEARCH_ENRICH_DEADLINE", 8.0))
+
+# Общий для процесса лимит одновременно выполняемых запросов пакетного поиска
+BATCH_SEARCH_CONCURRENCY = 5
+_batch_semaphore = asyncio.Semaphore(BATCH_SEARCH_CONCURRENCY)
 
 
 class SearchResult:
@@ -22,137 +47,389 @@ class SearchResult:
             "url": self.url,
             "snippet": self.snippet
         }
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> "SearchResult":
+        return cls(data["title"], data["url"], data["snippet"])
 
 
 class YandexSearchService:
-    def __init__(self):
-        self.auth_service = YandexAuthService()
+    def __init__(self, poll_initial_delay: float = 0.2, poll_max_delay: float = 1.0,
+                 poll_timeout: float = 30.0, enrichment_workers: int = DEFAULT_ENRICHMENT_WORKERS,
+                 enrichment_deadline: float = DEFAULT_ENRICHMENT_DEADLINE,
+                 head_bytes_limit: int = DEFAULT_HEAD_BYTES_LIMIT,
+                 cache: Optional[SearchCache] = None,
+                 auth_service: Optional[YandexAuthService] = None,
+                 client: Optional[httpx.AsyncClient] = None,
+                 page_client: Optional[httpx.AsyncClient] = None):
+        # Провайдер токена общий для процесса, чтобы кеш IAM токена реально переиспользовался
+        self.auth_service = auth_service or get_auth_service()
+        self.cache = cache or get_search_cache()
+        # Внешние клиенты позволяют всем поискам делить пулы соединений:
+        # client — для Yandex API, page_client — для сайтов из выдачи
+        self.client = client
+        self.page_client = page_client
+        self.timeout = httpx.Timeout(15.0)
+        # Параметры опроса операции: начинаем с короткой паузы и плавно её увеличиваем
+        self.poll_initial_delay = poll_initial_delay
+        self.poll_max_delay = poll_max_delay
+        self.poll_timeout = poll_timeout
+        # Дозагрузка заголовков/описаний: ограничение параллелизма и общий дедлайн этапа
+        self.enrichment_workers = enrichment_workers
+        self.enrichment_deadline = enrichment_deadline
+        # Для title/description читаем страницу только до </head>, но не больше лимита
+        self.head_bytes_limit = head_bytes_limit
+        self.enrichment_timeout = httpx.Timeout(10.0)
+        self.enrichment_headers = {
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+        }
     
-    def _extract_title_description(self, url: str) -> Tuple[str, str]:
-        """Извлечь title и description напрямую с сайта"""
-        try:
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-            }
-            response = requests.get(url, headers=headers, timeout=10)
+    @asynccontextmanager
+    async def _client_session(self, client: Optional[httpx.AsyncClient]):
+        """Переданный общий клиент или временный клиент на время вызова"""
+        if client is not None:
+            yield client
+        else:
+            async with httpx.AsyncClient() as client:
+                yield client
+    
+    async def _fetch_head(self, client: httpx.AsyncClient, url: str) -> Tuple[bytes, Optional[str]]:
+        """Потоково загрузить начало страницы до </head> или до лимита байт"""
+        buffer = bytearray()
+        
+        async with client.stream("GET", url, headers=self.enrichment_headers,
+                                 timeout=self.enrichment_timeout, follow_redirects=True) as response:
             response.raise_for_status()
+            content_type = response.headers.get("content-type")
             
-            soup = BeautifulSoup(response.content, "html.parser")
-            
-            title_tag = soup.find("title")
-            title = title_tag.text.strip() if title_tag else "Заголовок не получен, смотрите на странице"
+            async for chunk in response.aiter_bytes():
+                search_from = max(0, len(buffer) - len(HEAD_END_MARKER))
+                buffer.extend(chunk)
+                if find_head_end(buffer, search_from) != -1 or len(buffer) >= self.head_bytes_limit:
+                    break
+        
+        return bytes(buffer[:self.head_bytes_limit]), content_type
+    
+    async def _extract_title_description(self, client: httpx.AsyncClient, url: str) -> Tuple[str, str]:
+        """Извлечь title и description напрямую с сайта"""
+        # Недавно недоступные сайты не дёргаем повторно (кеш на SQLite — обращаемся из потока)
+        if await asyncio.to_thread(self.cache.is_failed_url, url):
+            return TITLE_PLACEHOLDER, DESCRIPTION_PLACEHOLDER
+        
+        try:
+            head_bytes, content_type = await self._fetch_head(client, url)
+            charset = detect_charset(content_type, head_bytes)
+            head = extract_head_meta(decode_html(head_bytes, charset))
             
-            description_tag = soup.find("meta", attrs={"name": "description"})
-            description = description_tag["content"].strip() if description_tag and description_tag.get("content") else "Описание не получено, смотрите на странице"
+            title = head.title or TITLE_PLACEHOLDER
+            description = head.description or DESCRIPTION_PLACEHOLDER
             
             return title, description
             
         except Exception as e:
-            return "Заголовок не получен, смотрите на странице", "Описание не получено, смотрите на странице"
+            await asyncio.to_thread(self.cache.mark_failed_url, url)
+            return TITLE_PLACEHOLDER, DESCRIPTION_PLACEHOLDER
     
-    def search(self, query: str, page_size: int = 10, region: int = 225) -> List[SearchResult]:
-        """Выполнить поиск через Yandex Search API с поддержкой пагинации"""
-        print(f"🔍 Поиск: '{query}' | Регион: {region} | Лимит: {page_size}")
-        iam_token = self.auth_service.get_iam_token()
-        
-        all_results = []
-        max_per_page = 10  # Yandex API ограничивает до 10 результатов на страницу
+    async def _submit_search(self, client: httpx.AsyncClient, iam_token: str,
+                             search_query: Dict) -> Optional[str]:
+        """Отправить асинхронный поисковый запрос и вернуть ID операции"""
+        response = await client.post(
+            SEARCH_ASYNC_URL,
+            headers={
+                "Authorization": f"Bearer {iam_token}",
+                "Content-Type": "application/json"
+            },
+            json=search_query,
+            timeout=self.timeout
+        )
         
-        # Вычисляем количество запросов для получения всех результатов
-        total_requests = (page_size + max_per_page - 1) // max_per_page  # Округление вверх
+        if response.status_code != 200:
+            print(f"❌ Ошибка отправки поискового запроса: {response.status_code}")
+            return None
         
-        for page_num in range(total_requests):
-            # Вычисляем сколько результатов запросить на этой странице
-            remaining_results = page_size - len(all_results)
-            current_page_size = min(max_per_page, remaining_results)
-            
-            if current_page_size <= 0:
-                break
-                
-            print(f"📄 Запрос страницы {page_num + 1}, размер: {current_page_size}")
-            
-            search_query = {
-                "query": {
-                    "searchType": 1,
-                    "queryText": query,
-                    "lr": region  # Параметр региона для поиска
-                },
-                "pageSize": current_page_size,
-                "responseFormat": 0  # XML
-            }
-            
-            # Добавляем параметр page если это не первая страница
-            if page_num > 0:
-                search_query["page"] = page_num
+        return response.json()["id"]
+    
+    async def _wait_for_operation(self, client: httpx.AsyncClient, iam_token: str,
+                                  operation_id: str) -> Optional[Dict]:
+        """Опрашивать операцию с адаптивной задержкой, пока она не завершится"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.poll_timeout
+        delay = self.poll_initial_delay
         
-            headers = {
-                "Authorization": f"Bearer {iam_token}",
-                "Content-Type": "application/json"
-            }
+        while True:
+            await asyncio.sleep(delay)
             
-            # Отправляем поисковый запрос
-            response = requests.post(
-                "https://searchapi.api.cloud.yandex.net/v2/web/searchAsync",
-                headers=headers,
-                json=search_query
+            result = await client.get(
+                OPERATION_URL.format(operation_id=operation_id),
+                headers={"Authorization": f"Bearer {iam_token}"},
+                timeout=self.timeout
             )
             
-            if response.status_code != 200:
-                print(f"❌ Ошибка запроса страницы {page_num + 1}: {response.status_code}")
-                break
+            if result.status_code != 200:
+                print(f"❌ Ошибка получения операции {operation_id}: {result.status_code}")
+                return None
             
-            operation_id = response.json()["id"]
+            operation = result.json()
+            if operation.get("done"):
+                if "error" in operation:
+                    print(f"❌ Операция {operation_id} завершилась с ошибкой: {operation['error']}")
+                    return None
+                return operation
             
-            # Ждём результат операции
-            import time
-            time.sleep(2)
+            if loop.time() + delay > deadline:
+                print(f"⏱️ Операция {operation_id} не завершилась за {self.poll_timeout} с")
+                return None
             
-            result = requests.get(
-                f"https://operation.api.cloud.yandex.net/operations/{operation_id}",
-                headers={"Authorization": f"Bearer {iam_token}"}
-            )
-            
-            if result.status_code != 200:
-                print(f"❌ Ошибка получения результата страницы {page_num + 1}: {result.status_code}")
-                break
+            delay = min(delay * 1.5, self.poll_max_delay)
+    
+    def _iter_page_results(self, raw_xml: bytes) -> Iterator[SearchResult]:
+        """Потоково разобрать XML выдачи: результат отдаётся, как только закрыт его <doc>"""
+        group_depth = 0
+        
+        for event, element in ET.iterparse(io.BytesIO(raw_xml), events=("start", "end")):
+            if element.tag == "group":
+                if event == "start":
+                    group_depth += 1
+                else:
+                    group_depth -= 1
+                    element.clear()
+            elif event == "end" and element.tag == "doc" and group_depth > 0:
+                title = element.findtext('title') or element.findtext('headline') or ""
+                url = element.findtext('url') or "Без URL"
+                snippet = element.findtext('passages/passage') or element.findtext('headline') or ""
+                # Разобранный документ больше не нужен — освобождаем его поддерево
+                element.clear()
+                yield SearchResult(title.strip(), url, snippet.strip())
+    
+    def _needs_enrichment(self, result: SearchResult) -> bool:
+        """Короткий title или snippet — нужно дозагрузить данные с сайта"""
+        return len(result.title) < MIN_TITLE_LENGTH or len(result.snippet) < MIN_SNIPPET_LENGTH
+    
+    async def _enrich_result(self, client: httpx.AsyncClient, result: SearchResult,
+                             semaphore: asyncio.Semaphore) -> None:
+        """Дозагрузить title/description одного результата с сайта"""
+        async with semaphore:
+            fetched_title, fetched_desc = await self._extract_title_description(client, result.url)
+        
+        if len(result.title) < MIN_TITLE_LENGTH:
+            result.title = fetched_title
+        if len(result.snippet) < MIN_SNIPPET_LENGTH:
+            result.snippet = fetched_desc
+    
+    def _apply_placeholders(self, result: SearchResult) -> None:
+        """Заглушки для результата, дозагрузка которого не успела к дедлайну"""
+        if len(result.title) < MIN_TITLE_LENGTH:
+            result.title = TITLE_PLACEHOLDER
+        if len(result.snippet) < MIN_SNIPPET_LENGTH:
+            result.snippet = DESCRIPTION_PLACEHOLDER
+    
+    async def _fetch_page(self, client: httpx.AsyncClient, iam_token: str, query: str,
+                          region: int, page_num: int, current_page_size: int) -> Optional[bytes]:
+        """Запросить одну страницу выдачи и вернуть её XML (None — страница не получена)"""
+        print(f"📄 Запрос страницы {page_num + 1}, размер: {current_page_size}")
+        
+        search_query = {
+            "query": {
+                "searchType": 1,
+                "queryText": query,
+                "lr": region  # Параметр региона для поиска
+            },
+            "pageSize": current_page_size,
+            "responseFormat": 0  # XML
+        }
+        
+        # Добавляем параметр page если это не первая страница
+        if page_num > 0:
+            search_query["page"] = page_num
+        
+        try:
+            operation_id = await self._submit_search(client, iam_token, search_query)
+            if not operation_id:
+                return None
             
+            operation = await self._wait_for_operation(client, iam_token, operation_id)
+            if not operation:
+                print(f"❌ Не удалось получить результат страницы {page_num + 1}")
+                return None
+        except httpx.HTTPError as e:
+            print(f"❌ Ошибка запроса страницы {page_num + 1}: {str(e)}")
+            return None
+        
+        try:
+            return base64.b64decode(operation["response"]["rawData"])
+        except (KeyError, ValueError) as e:
+            print(f"❌ Ошибка декодирования выдачи страницы {page_num + 1}: {str(e)}")
+            return None
+    
+    async def iter_search_events(self, query: str, page_size: int = 10,
+                                 region: int = 225) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        Поиск с выдачей событий по мере готовности
+        
+        События:
+            ("page", {...}): результаты очередной страницы (по порядку страниц)
+            ("enrichment", {...}): дозагруженные title/snippet результата с индексом index
+            ("done", {...}): поиск завершён
+        """
+        print(f"🔍 Поиск: '{query}' | Регион: {region} | Лимит: {page_size}")
+        
+        cache_key = SearchCache.make_key(query, region, page_size)
+        cached_results = await asyncio.to_thread(self.cache.get, cache_key)
+        if cached_results is not None:
+            print(f"⚡ Результаты взяты из кеша: {len(cached_results)}")
+            yield "page", {"page": 1, "offset": 0, "results": cached_results, "from_cache": True}
+            yield "done", {"query": query, "total_found": len(cached_results), "from_cache": True}
+            return
+        
+        iam_token = await self.auth_service.get_iam_token()
+        
+        max_per_page = 10  # Yandex API ограничивает до 10 результатов на страницу
+        
+        # Размеры всех страниц известны заранее, поэтому запрашиваем их одновременно
+        page_sizes = [
+            min(max_per_page, page_size - offset)
+            for offset in range(0, page_size, max_per_page)
+        ]
+        
+        all_results = []
+        page_tasks = []
+        enrichment_tasks = {}
+        semaphore = asyncio.Semaphore(self.enrichment_workers)
+        
+        async with self._client_session(self.client) as client, \
+                self._client_session(self.page_client) as page_client:
             try:
-                raw_base64 = result.json()["response"]["rawData"]
-                decoded_xml = base64.b64decode(raw_base64).decode("utf-8")
-                root = ET.fromstring(decoded_xml)
+                page_tasks = [
+                    asyncio.create_task(
+                        self._fetch_page(client, iam_token, query, region, page_num, current_page_size)
+                    )
+                    for page_num, current_page_size in enumerate(page_sizes)
+                ]
                 
-                page_results = []
-                
-                for doc in root.findall('.//group/doc'):
-                    title = doc.findtext('title') or doc.findtext('headline') or ""
-                    url = doc.findtext('url') or "Без URL"
-                    snippet = doc.findtext('passages/passage') or doc.findtext('headline') or ""
+                # Отдаём страницы по порядку, обрывая на первой неполной или неполученной
+                for page_num, (page_task, current_page_size) in enumerate(zip(page_tasks, page_sizes)):
+                    raw_xml = await page_task
+                    if raw_xml is None:
+                        break
+                    
+                    offset = len(all_results)
+                    page_results = []
+                    parse_failed = False
+                    
+                    try:
+                        for result in self._iter_page_results(raw_xml):
+                            if len(page_results) >= current_page_size:
+                                break
+                            
+                            # Слабые результаты начинаем дозагружать сразу, не дожидаясь конца разбора
+                            if self._needs_enrichment(result):
+                                task = asyncio.create_task(self._enrich_result(page_client, result, semaphore))
+                                enrichment_tasks[task] = offset + len(page_results)
+                            page_results.append(result)
+                    except ET.ParseError as e:
+                        print(f"❌ Ошибка разбора XML страницы {page_num + 1}: {str(e)}")
+                        parse_failed = True
                     
-                    # Если title или snippet плохие — парсим вручную с сайта
-                    if len(title.strip()) < 10 or len(snippet.strip()) < 40:
-                        fetched_title, fetched_desc = self._extract_title_description(url)
-                        if len(title.strip()) < 10:
-                            title = fetched_title
-                        if len(snippet.strip()) < 40:
-                            snippet = fetched_desc
+                    all_results.extend(page_results)
+                    print(f"✅ Страница {page_num + 1}: получено {len(page_results)} результатов")
                     
-                    # Итоговая защита
-                    title = title.strip() or "Заголовок не найден, смотрите на странице"
-                    snippet = snippet.strip() or "Описание не найдено, смотрите на странице"
+                    yield "page", {
+                        "page": page_num + 1,
+                        "offset": offset,
+                        "results": [result.to_dict() for result in page_results],
+                        "from_cache": False
+                    }
                     
-                    page_results.append(SearchResult(title, url, snippet))
+                    if parse_failed:
+                        break
+                    
+                    # Если получили меньше результатов чем ожидали, значит это последняя страница
+                    if len(page_results) < current_page_size:
+                        print(f"📄 Достигнут конец результатов на странице {page_num + 1}")
+                        break
                 
-                all_results.extend(page_results)
-                print(f"✅ Страница {page_num + 1}: получено {len(page_results)} результатов")
+                for page_task in page_tasks:
+                    page_task.cancel()
                 
-                # Если получили меньше результатов чем ожидали, значит это последняя страница
-                if len(page_results) < current_page_size:
-                    print(f"📄 Достигнут конец результатов на странице {page_num + 1}")
-                    break
-                    
-            except Exception as e:
-                print(f"❌ Ошибка разбора XML страницы {page_num + 1}: {str(e)}")
-                break
+                if enrichment_tasks:
+                    print(f"🔎 Дозагрузка данных для {len(enrichment_tasks)} результатов")
+                
+                loop = asyncio.get_running_loop()
+                deadline = loop.time() + self.enrichment_deadline
+                pending = set(enrichment_tasks)
+                
+                while pending and loop.time() < deadline:
+                    done, pending = await asyncio.wait(
+                        pending, timeout=deadline - loop.time(), return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for task in done:
+                        index = enrichment_tasks[task]
+                        yield "enrichment", {"index": index, **all_results[index].to_dict()}
+                
+                # Не успевшие к дедлайну результаты получают стандартные заглушки
+                if pending:
+                    print(f"⏱️ Дедлайн дозагрузки: {len(pending)} результатов оставлены с заглушками")
+                for task in pending:
+                    task.cancel()
+                    index = enrichment_tasks[task]
+                    self._apply_placeholders(all_results[index])
+                    yield "enrichment", {"index": index, **all_results[index].to_dict()}
+            finally:
+                # Клиент мог отключиться посреди потока — гасим всё, что ещё выполняется
+                outstanding = [task for task in [*page_tasks, *enrichment_tasks] if not task.done()]
+                for task in outstanding:
+                    task.cancel()
+                if outstanding:
+                    await asyncio.wait(outstanding)
+        
+        # Итоговая защита
+        for result in all_results:
+            result.title = result.title.strip() or "Заголовок не найден, смотрите на странице"
+            result.snippet = result.snippet.strip() or "Описание не найдено, смотрите на странице"
+        
+        # Пустую выдачу не кешируем: это может быть временный сбой API
+        if all_results:
+            await asyncio.to_thread(self.cache.set, cache_key, [result.to_dict() for result in all_results])
         
         print(f"📊 Итого получено: {len(all_results)} результатов")
-        return all_results[:page_size]  # Ограничиваем точно до запрошенного количества
\ No newline at end of file
+        yield "done", {"query": query, "total_found": len(all_results), "from_cache": False}
+    
+    async def search(self, query: str, page_size: int = 10, region: int = 225) -> List[SearchResult]:
+        """Выполнить поиск через Yandex Search API с поддержкой пагинации"""
+        results = []
+        
+        async for event_type, payload in self.iter_search_events(query, page_size, region):
+            if event_type == "page":
+                results.extend(payload["results"])
+            elif event_type == "enrichment":
+                index = payload["index"]
+                results[index] = {key: payload[key] for key in ("title", "url", "snippet")}
+        
+        return [SearchResult.from_dict(item) for item in results]
+    
+    async def search_batch(self, queries: List[Tuple[str, int, int]]) -> List[Union[List[SearchResult], Exception]]:
+        """
+        Выполнить несколько поисков (query, page_size, region) параллельно под общим лимитом
+        
+        Запросы с одинаковым ключом кеша выполняются один раз: иначе одновременные промахи кеша
+        тратят платную квоту на одну и ту же выдачу. Результат раздаётся всем совпавшим позициям.
+        """
+        async def run_query(query: str, page_size: int, region: int) -> List[SearchResult]:
+            async with _batch_semaphore:
+                return await self.search(query, page_size, region)
+        
+        unique_queries = {}
+        for query, page_size, region in queries:
+            unique_queries.setdefault(SearchCache.make_key(query, region, page_size), (query, page_size, region))
+        
+        outcomes = await asyncio.gather(
+            *[run_query(query, page_size, region) for query, page_size, region in unique_queries.values()],
+            return_exceptions=True
+        )
+        outcome_by_key = dict(zip(unique_queries, outcomes))
+        
+        results = []
+        for query, page_size, region in queries:
+            outcome = outcome_by_key[SearchCache.make_key(query, region, page_size)]
+            results.append(outcome if isinstance(outcome, Exception) else list(outcome))
+        return results
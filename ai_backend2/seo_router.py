@@ -2,19 +2,28 @@
 FastAPI роутер для SEO Copywriter модуля
 """
 
-import time
-import requests
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import asyncio
 import json
+import httpx
 from datetime import datetime
+from concurrent.futures import Executor
 from search_service import YandexSearchService, SearchResult
+from search_cache import get_search_cache
+from page_cache import get_page_cache
+from article_cache import get_article_cache
+from template_store import get_template_store
+from boilerplate_index import get_boilerplate_index
+from alternate_store import get_alternate_store
 from content_parser import ContentParser, ArticleContent
 from openai_service import OpenAIService, GeneratedArticle
 from text_ru_service import TextRuService
+from http_clients import HttpClients, get_http_clients
+from fetch_engine import FetchEngine, get_fetch_engine
+from parse_pool import get_parse_pool
 
 
 class SearchRequest(BaseModel):
@@ -35,10 +44,31 @@ class SearchResponse(BaseModel):
     total_found: int
 
 
+class BatchSearchRequest(BaseModel):
+    queries: List[SearchRequest]
+
+
+class BatchSearchItem(BaseModel):
+    query: str
+    region: int
+    page_size: int
+    results: List[SearchResultResponse]
+    total_found: int
+    error: Optional[str] = None
+
+
+class BatchSearchResponse(BaseModel):
+    results: List[BatchSearchItem]
+    unique_urls: List[str]  # Объединение URL всех запросов без повторов
+    total_queries: int
+    total_unique_urls: int
+
+
 class CleaningSettings(BaseModel):
     mode: Optional[str] = "automatic"  # "automatic" или "manual"
     remove_technical_blocks: Optional[bool] = True
     remove_duplicates: Optional[bool] = True
+    remove_boilerplate: Optional[bool] = True  # Шаблонный текст сайта по индексу домена
     filter_relevance: Optional[bool] = True
     min_paragraph_length: Optional[int] = 50
     max_paragraph_length: Optional[int] = 2000
@@ -46,12 +76,13 @@ class CleaningSettings(BaseModel):
 
 class ParseRequest(BaseModel):
     urls: List[str]
-    delay: Optional[float] = 1.0
+    delay: Optional[float] = 1.0  # Не используется: частоту запросов к сайтам задаёт FetchEngine
     enable_cleaning: Optional[bool] = True
     enable_chunking: Optional[bool] = False
     chunk_size: Optional[int] = 1000
     chunking_method: Optional[str] = "paragraphs"
     cleaning_settings: Optional[CleaningSettings] = None
+    prefer_light_version: Optional[bool] = False  # AMP / версия для печати там, где они проверены для домена
 
 
 class ArticleContentResponse(BaseModel):
@@ -72,6 +103,12 @@ class ParseError(BaseModel):
     error: str
     error_type: str  # "request_error", "parsing_error", "content_too_short"
 
+class ParseSummary(BaseModel):
+    total_requested: int
+    total_parsed: int
+    total_failed: int
+    success_rate: float
+
 class ParseResponse(BaseModel):
     parsed_articles: List[ArticleContentResponse]
     failed_urls: List[ParseError]
@@ -175,7 +212,7 @@ router = APIRouter(prefix="/seo", tags=["SEO Copywriter"])
 
 
 @router.post("/search", response_model=SearchResponse)
-async def search_yandex(request: SearchRequest):
+async def search_yandex(request: SearchRequest, http_clients: HttpClients = Depends(get_http_clients)):
     """
     Выполнить поиск через Yandex Search API
     """
@@ -183,8 +220,10 @@ async def search_yandex(request: SearchRequest):
         raise HTTPException(status_code=400, detail="Поисковый запрос не может быть пустым")
     
     try:
-        search_service = YandexSearchService()
-        results = search_service.search(request.query, request.page_size, request.region)
+        search_service = YandexSearchService(
+            client=http_clients.yandex_search, page_client=http_clients.articles
+        )
+        results = await search_service.search(request.query, request.page_size, request.region)
         
         response_results = [
             SearchResultResponse(
@@ -205,104 +244,293 @@ async def search_yandex(request: SearchRequest):
         raise HTTPException(status_code=500, detail=f"Ошибка поиска: {str(e)}")
 
 
-@router.post("/parse", response_model=ParseResponse)
-async def parse_articles(request: ParseRequest):
+@router.post("/search-stream")
+async def search_yandex_stream(request: SearchRequest,
+                               http_clients: HttpClients = Depends(get_http_clients)):
+    """Поиск с потоковой передачей результатов через SSE: страницы и дозагрузка по мере готовности"""
+    if not request.query.strip():
+        raise HTTPException(status_code=400, detail="Поисковый запрос не может быть пустым")
+    
+    async def search_with_events():
+        """Генератор событий поиска"""
+        try:
+            search_service = YandexSearchService(
+                client=http_clients.yandex_search, page_client=http_clients.articles
+            )
+            async for event_type, payload in search_service.iter_search_events(
+                request.query, request.page_size, request.region
+            ):
+                yield f"data: {json.dumps({event_type: payload, 'timestamp': datetime.now().isoformat()}, ensure_ascii=False)}\n\n"
+                
+        except Exception as e:
+            error_msg = f"❌ Ошибка поиска: {str(e)}"
+            yield f"data: {json.dumps({'error': error_msg, 'timestamp': datetime.now().isoformat()}, ensure_ascii=False)}\n\n"
+    
+    return StreamingResponse(
+        search_with_events(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "Content-Type": "text/event-stream",
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Headers": "Cache-Control"
+        }
+    )
+
+
+@router.post("/search/batch", response_model=BatchSearchResponse)
+async def search_yandex_batch(request: BatchSearchRequest,
+                              http_clients: HttpClients = Depends(get_http_clients)):
     """
-    Парсинг полного контента статей по списку URL
+    Пакетный поиск: несколько запросов параллельно с общим токеном и пулом соединений
     """
+    if not request.queries:
+        raise HTTPException(status_code=400, detail="Список запросов не может быть пустым")
+    
+    if len(request.queries) > 30:
+        raise HTTPException(status_code=400, detail="Максимум 30 запросов за один вызов")
+    
+    if any(not item.query.strip() for item in request.queries):
+        raise HTTPException(status_code=400, detail="Поисковый запрос не может быть пустым")
+    
+    try:
+        queries = [(item.query, item.page_size, item.region) for item in request.queries]
+        
+        search_service = YandexSearchService(
+            client=http_clients.yandex_search, page_client=http_clients.articles
+        )
+        outcomes = await search_service.search_batch(queries)
+        
+        batch_results = []
+        unique_urls = []
+        seen_urls = set()
+        
+        for (query, page_size, region), outcome in zip(queries, outcomes):
+            if isinstance(outcome, Exception):
+                batch_results.append(BatchSearchItem(
+                    query=query, region=region, page_size=page_size,
+                    results=[], total_found=0, error=f"Ошибка поиска: {str(outcome)}"
+                ))
+                continue
+            
+            for result in outcome:
+                if result.url not in seen_urls:
+                    seen_urls.add(result.url)
+                    unique_urls.append(result.url)
+            
+            batch_results.append(BatchSearchItem(
+                query=query, region=region, page_size=page_size,
+                results=[SearchResultResponse(**result.to_dict()) for result in outcome],
+                total_found=len(outcome)
+            ))
+        
+        return BatchSearchResponse(
+            results=batch_results,
+            unique_urls=unique_urls,
+            total_queries=len(batch_results),
+            total_unique_urls=len(unique_urls)
+        )
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка пакетного поиска: {str(e)}")
+
+
+@router.get("/search/cache-stats")
+async def get_search_cache_stats():
+    """Статистика кеша поисковой выдачи (попадания/промахи текущего процесса)"""
+    return get_search_cache().get_stats()
+
+
+@router.get("/parse/cache-stats")
+async def get_parse_cache_stats():
+    """Статистика кешей парсинга: HTTP-кеш страниц, кеш этапов обработки, шаблоны и облегчённые версии доменов"""
+    return {
+        "pages": await asyncio.to_thread(get_page_cache().get_stats),
+        "articles": get_article_cache().get_stats(),
+        "templates": await asyncio.to_thread(get_template_store().get_stats),
+        "boilerplate": await asyncio.to_thread(get_boilerplate_index().get_stats),
+        "alternates": await asyncio.to_thread(get_alternate_store().get_stats)
+    }
+
+
+def _validate_parse_request(request: ParseRequest) -> None:
     if not request.urls:
         raise HTTPException(status_code=400, detail="Список URL не может быть пустым")
     
     if len(request.urls) > 20:
         raise HTTPException(status_code=400, detail="Максимум 20 URL за один запрос")
+
+
+def _create_content_parser(request: ParseRequest, fetch_engine: FetchEngine,
+                           parse_pool: Optional[Executor]) -> ContentParser:
+    """Парсер с настройками очистки и чанкинга из запроса"""
+    # Подготавливаем настройки очистки
+    cleaning_settings = {}
+    if request.cleaning_settings:
+        cleaning_settings = {
+            'mode': request.cleaning_settings.mode,
+            'remove_technical_blocks': request.cleaning_settings.remove_technical_blocks,
+            'remove_duplicates': request.cleaning_settings.remove_duplicates,
+            'remove_boilerplate': request.cleaning_settings.remove_boilerplate,
+            'filter_relevance': request.cleaning_settings.filter_relevance,
+            'min_paragraph_length': request.cleaning_settings.min_paragraph_length,
+            'max_paragraph_length': request.cleaning_settings.max_paragraph_length,
+            'relevance_threshold': request.cleaning_settings.relevance_threshold
+        }
+    
+    return ContentParser(
+        enable_cleaning=request.enable_cleaning,
+        enable_chunking=request.enable_chunking, 
+        chunk_size=request.chunk_size,
+        cleaning_settings=cleaning_settings,
+        chunking_method=request.chunking_method,
+        fetch_engine=fetch_engine,
+        executor=parse_pool,
+        prefer_light_version=request.prefer_light_version
+    )
+
+
+def _parse_error(url: str, result: Any) -> Optional[ParseError]:
+    """Ошибка парсинга URL (None — статья получена)"""
+    if isinstance(result, httpx.HTTPError):
+        return ParseError(
+            url=url,
+            error=f"Ошибка HTTP запроса: {str(result)}",
+            error_type="request_error"
+        )
+    if isinstance(result, Exception):
+        return ParseError(
+            url=url,
+            error=f"Ошибка парсинга: {str(result)}",
+            error_type="parsing_error"
+        )
+    if not result:
+        return ParseError(
+            url=url,
+            error="Не удалось извлечь контент (слишком мало текста или ошибка парсинга)",
+            error_type="content_too_short"
+        )
+    return None
+
+
+def _article_response(article: ArticleContent) -> ArticleContentResponse:
+    return ArticleContentResponse(
+        url=article.url,
+        title=article.title,
+        content=article.content,
+        cleaned_content=article.cleaned_content,
+        meta_description=article.meta_description,
+        word_count=article.word_count,
+        cleaned_word_count=article.cleaned_word_count,
+        content_stats=article.content_stats,
+        chunks=[chunk.to_dict() for chunk in article.chunks],
+        chunking_stats=article.chunking_stats
+    )
+
+
+def _parse_summary(total_requested: int, total_parsed: int) -> ParseSummary:
+    return ParseSummary(
+        total_requested=total_requested,
+        total_parsed=total_parsed,
+        total_failed=total_requested - total_parsed,
+        success_rate=(total_parsed / total_requested) * 100 if total_requested > 0 else 0
+    )
+
+
+@router.post("/parse", response_model=ParseResponse)
+async def parse_articles(request: ParseRequest, fetch_engine: FetchEngine = Depends(get_fetch_engine),
+                         parse_pool: Optional[Executor] = Depends(get_parse_pool)):
+    """
+    Парсинг полного контента статей по списку URL
+    """
+    _validate_parse_request(request)
     
     try:
-        # Подготавливаем настройки очистки
-        cleaning_settings = {}
-        if request.cleaning_settings:
-            cleaning_settings = {
-                'mode': request.cleaning_settings.mode,
-                'remove_technical_blocks': request.cleaning_settings.remove_technical_blocks,
-                'remove_duplicates': request.cleaning_settings.remove_duplicates,
-                'filter_relevance': request.cleaning_settings.filter_relevance,
-                'min_paragraph_length': request.cleaning_settings.min_paragraph_length,
-                'max_paragraph_length': request.cleaning_settings.max_paragraph_length,
-                'relevance_threshold': request.cleaning_settings.relevance_threshold
-            }
+        parser = _create_content_parser(request, fetch_engine, parse_pool)
         
-        parser = ContentParser(
-            enable_cleaning=request.enable_cleaning,
-            enable_chunking=request.enable_chunking, 
-            chunk_size=request.chunk_size,
-            cleaning_settings=cleaning_settings
+        # Парсим статьи параллельно (общий лимит загрузок задаёт FetchEngine)
+        # и собираем информацию об ошибках в исходном порядке URL
+        results = await asyncio.gather(
+            *(parser.parse_article(url) for url in request.urls),
+            return_exceptions=True
         )
         
-        # Парсим статьи и собираем информацию об ошибках
-        articles = []
+        response_articles = []
         failed_urls = []
         
-        for url in request.urls:
-            try:
-                article = parser.parse_article(url)
-                if article:
-                    articles.append(article)
-                else:
-                    failed_urls.append(ParseError(
-                        url=url,
-                        error="Не удалось извлечь контент (слишком мало текста или ошибка парсинга)",
-                        error_type="content_too_short"
-                    ))
-            except requests.RequestException as e:
-                failed_urls.append(ParseError(
-                    url=url,
-                    error=f"Ошибка HTTP запроса: {str(e)}",
-                    error_type="request_error"
-                ))
-            except Exception as e:
-                failed_urls.append(ParseError(
-                    url=url,
-                    error=f"Ошибка парсинга: {str(e)}",
-                    error_type="parsing_error"
-                ))
-            
-            # Задержка между запросами
-            if request.delay and request.delay > 0:
-                time.sleep(request.delay)
-        
-        response_articles = [
-            ArticleContentResponse(
-                url=article.url,
-                title=article.title,
-                content=article.content,
-                cleaned_content=article.cleaned_content,
-                meta_description=article.meta_description,
-                word_count=article.word_count,
-                cleaned_word_count=article.cleaned_word_count,
-                content_stats=article.content_stats,
-                chunks=[chunk.to_dict() for chunk in article.chunks],
-                chunking_stats=article.chunking_stats
-            )
-            for article in articles
-        ]
+        for url, result in zip(request.urls, results):
+            error = _parse_error(url, result)
+            if error:
+                failed_urls.append(error)
+            else:
+                response_articles.append(_article_response(result))
         
-        total_requested = len(request.urls)
-        total_parsed = len(response_articles)
-        total_failed = len(failed_urls)
-        success_rate = (total_parsed / total_requested) * 100 if total_requested > 0 else 0
+        summary = _parse_summary(len(request.urls), len(response_articles))
         
         return ParseResponse(
             parsed_articles=response_articles,
             failed_urls=failed_urls,
-            total_requested=total_requested,
-            total_parsed=total_parsed,
-            total_failed=total_failed,
-            success_rate=success_rate
+            **summary.dict()
         )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка парсинга: {str(e)}")
 
 
+@router.post("/parse-stream")
+async def parse_articles_stream(request: ParseRequest, fetch_engine: FetchEngine = Depends(get_fetch_engine),
+                                parse_pool: Optional[Executor] = Depends(get_parse_pool)):
+    """Парсинг с потоковой передачей через SSE: каждая статья или ошибка — сразу по готовности, в конце итог"""
+    _validate_parse_request(request)
+    
+    async def parse_with_events():
+        """Генератор событий парсинга (готовые статьи в памяти не накапливаются)"""
+        parser = _create_content_parser(request, fetch_engine, parse_pool)
+        
+        async def parse_url(url: str):
+            try:
+                return url, await parser.parse_article(url)
+            except Exception as e:
+                return url, e
+        
+        tasks = [asyncio.create_task(parse_url(url)) for url in request.urls]
+        total_parsed = 0
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                url, result = await next_result
+                error = _parse_error(url, result)
+                if error:
+                    event = {'failed': error.dict()}
+                else:
+                    total_parsed += 1
+                    event = {'article': _article_response(result).dict()}
+                yield f"data: {json.dumps({**event, 'timestamp': datetime.now().isoformat()}, ensure_ascii=False)}\n\n"
+            
+            summary = _parse_summary(len(request.urls), total_parsed)
+            yield f"data: {json.dumps({'summary': summary.dict(), 'timestamp': datetime.now().isoformat()}, ensure_ascii=False)}\n\n"
+            
+        except Exception as e:
+            error_msg = f"❌ Ошибка парсинга: {str(e)}"
+            yield f"data: {json.dumps({'error': error_msg, 'timestamp': datetime.now().isoformat()}, ensure_ascii=False)}\n\n"
+        finally:
+            # Клиент отключился — оставшиеся загрузки не нужны
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(
+        parse_with_events(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "Content-Type": "text/event-stream",
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Headers": "Cache-Control"
+        }
+    )
+
+
 @router.post("/generate-plan", response_model=GeneratePlanResponse)
 async def generate_article_plan(request: GeneratePlanRequest):
     """Генерирует план статьи с использованием новой логики: векторизация → суммаризация → план"""
@@ -386,7 +614,8 @@ async def generate_article_plan(request: GeneratePlanRequest):
         raise HTTPException(status_code=500, detail=f"Ошибка генерации плана: {str(e)}")
 
 @router.post("/generate", response_model=GeneratedArticleResponse)
-async def generate_article(request: GenerateRequest):
+async def generate_article(request: GenerateRequest, fetch_engine: FetchEngine = Depends(get_fetch_engine),
+                           parse_pool: Optional[Executor] = Depends(get_parse_pool)):
     """
     Полная генерация статьи: поиск → парсинг → очистка → чанкинг → GPT генерация
     """
@@ -415,9 +644,11 @@ async def generate_article(request: GenerateRequest):
             parser = ContentParser(
                 enable_cleaning=request.enable_cleaning,
                 enable_chunking=True,
-                chunk_size=request.chunk_size
+                chunk_size=request.chunk_size,
+                fetch_engine=fetch_engine,
+                executor=parse_pool
             )
-            articles = parser.parse_multiple_articles(request.source_urls, delay=1.0)
+            articles = await parser.parse_multiple_articles(request.source_urls)
             
             if not articles:
                 raise HTTPException(status_code=404, detail="Не удалось спарсить ни одну статью")
@@ -905,7 +1136,8 @@ class SeoQualityResponse(BaseModel):
 
 
 @router.post("/check-seo-quality", response_model=SeoQualityResponse)
-async def check_seo_quality(request: SeoQualityCheckRequest):
+async def check_seo_quality(request: SeoQualityCheckRequest,
+                            http_clients: HttpClients = Depends(get_http_clients)):
     """
     Проверяет SEO-качество сгенерированного текста через API text.ru
     
@@ -922,10 +1154,10 @@ async def check_seo_quality(request: SeoQualityCheckRequest):
         text_ru_api_key = os.getenv("TEXT_RU_API_KEY", "ff355ac3b34a87295a0b78617a407477")
         
         # Инициализируем сервис
-        text_ru_service = TextRuService(text_ru_api_key)
+        text_ru_service = TextRuService(text_ru_api_key, client=http_clients.text_ru)
         
         # Проверяем баланс
-        balance = text_ru_service.get_balance()
+        balance = await text_ru_service.get_balance()
         if balance <= 0:
             return SeoQualityResponse(
                 status="error",
@@ -952,7 +1184,7 @@ async def check_seo_quality(request: SeoQualityCheckRequest):
             )
         
         # Выполняем полную проверку качества
-        results = text_ru_service.check_text_quality(request.text, request.max_wait_time)
+        results = await text_ru_service.check_text_quality(request.text, request.max_wait_time)
         
         if results['status'] == 'error':
             return SeoQualityResponse(
@@ -1025,7 +1257,7 @@ async def check_seo_quality(request: SeoQualityCheckRequest):
 
 
 @router.get("/text-ru-balance")
-async def get_text_ru_balance():
+async def get_text_ru_balance(http_clients: HttpClients = Depends(get_http_clients)):
     """
     Получает остаток символов на балансе text.ru
     """
@@ -1033,9 +1265,9 @@ async def get_text_ru_balance():
         import os
         
         text_ru_api_key = os.getenv("TEXT_RU_API_KEY", "ff355ac3b34a87295a0b78617a407477")
-        text_ru_service = TextRuService(text_ru_api_key)
+        text_ru_service = TextRuService(text_ru_api_key, client=http_clients.text_ru)
         
-        balance = text_ru_service.get_balance()
+        balance = await text_ru_service.get_balance()
         
         return {
             "status": "success",
@@ -0,0 +1,112 @@
+"""
+Память шаблонов извлечения по доменам: путь к контейнеру статьи, найденный эвристиками на прошлых страницах
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+from search_cache import CACHE_DIR
+from parser_backends import EXTRACTION_PATH_TEMPLATE, EXTRACTION_PATH_HEURISTICS
+
+
+class TemplateStore:
+    def __init__(self, db_path: str = None):
+        """
+        Инициализация хранилища
+
+        Args:
+            db_path: Путь к SQLite базе (общая для всех воркеров на узле, переживает перезапуск)
+        """
+        self.db_path = db_path or os.path.join(CACHE_DIR, "domain_templates.sqlite3")
+
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "learned": 0}
+
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._connection = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS templates "
+            "(domain TEXT PRIMARY KEY, path TEXT NOT NULL, hits INTEGER NOT NULL DEFAULT 0, "
+            "misses INTEGER NOT NULL DEFAULT 0, updated_at REAL NOT NULL)"
+        )
+        self._connection.commit()
+
+    @staticmethod
+    def domain_of(url: str) -> str:
+        """Домен страницы (www. не различаем)"""
+        domain = urlparse(url).netloc.lower()
+        return domain[4:] if domain.startswith("www.") else domain
+
+    def get(self, domain: str) -> Optional[List]:
+        """Сохранённый путь к контейнеру статьи или None"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT path FROM templates WHERE domain = ?", (domain,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def record(self, domain: str, outcome: Optional[Dict], accepted: bool) -> None:
+        """
+        Учесть результат извлечения страницы домена
+
+        Args:
+            domain: Домен страницы
+            outcome: {"tried": шаблон или None, "extraction_path": ..., "template": путь контейнера}
+                     (None — извлечение взято из кеша)
+            accepted: Статья прошла проверки и попала в результат
+        """
+        # Извлечение из кеша или из структурированных данных — DOM не разбирался, шаблон ни при чём
+        if outcome is None:
+            return
+        if outcome["extraction_path"] not in (EXTRACTION_PATH_TEMPLATE, EXTRACTION_PATH_HEURISTICS):
+            return
+
+        hit = outcome["extraction_path"] == EXTRACTION_PATH_TEMPLATE
+        # Запоминаем путь, который дали эвристики на принятой статье (в том числе взамен промахнувшегося)
+        learn = accepted and not hit and outcome["template"] and outcome["template"] != outcome["tried"]
+
+        with self._lock:
+            if outcome["tried"]:
+                counter = "hits" if hit else "misses"
+                self.stats[counter] += 1
+                self._connection.execute(
+                    f"UPDATE templates SET {counter} = {counter} + 1 WHERE domain = ?", (domain,)
+                )
+            if learn:
+                self._connection.execute(
+                    "INSERT INTO templates (domain, path, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(domain) DO UPDATE SET path = excluded.path, updated_at = excluded.updated_at",
+                    (domain, json.dumps(outcome["template"], ensure_ascii=False), time.time())
+                )
+                self.stats["learned"] += 1
+            self._connection.commit()
+
+    def get_stats(self) -> Dict:
+        """Счётчики текущего процесса и накопленные попадания по всем доменам"""
+        with self._lock:
+            domains, hits, misses = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(hits), 0), COALESCE(SUM(misses), 0) FROM templates"
+            ).fetchone()
+            return {
+                **self.stats,
+                "domains": domains,
+                "total_hits": hits,
+                "total_misses": misses,
+                "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0
+            }
+
+
+_template_store = None
+
+
+def get_template_store() -> TemplateStore:
+    """Общий для процесса экземпляр хранилища шаблонов"""
+    global _template_store
+    if _template_store is None:
+        _template_store = TemplateStore()
+    return _template_store
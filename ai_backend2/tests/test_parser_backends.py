@@ -0,0 +1,109 @@
+"""
+Извлечение контента на сохранённом корпусе: совпадение бэкендов и неизменность результата
+
+Эталон (fixtures/parser_corpus/expected.json) — результат извлечения до изменения алгоритма. Если изменение
+намеренно меняет текст, эталон пересобирается и расхождения просматриваются в диффе:
+    python tests/test_parser_backends.py --update
+"""
+
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark_parsers import COMPARED_FIELDS, load_corpus
+from parser_backends import PARSER_BACKENDS, available_backends, get_parser_backend
+
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "parser_corpus")
+EXPECTED_PATH = os.path.join(CORPUS_DIR, "expected.json")
+
+# Эталонный бэкенд; остальные хранят в эталоне только отличающиеся поля
+REFERENCE_BACKEND = "html.parser"
+SNAPSHOT_FIELDS = COMPARED_FIELDS + ("extraction_path",)
+
+# Адреса страниц корпуса (по ним JSON-LD выбирает статью этой страницы)
+PAGE_URLS = {
+    "json_ld.html": "https://news.example.ru/2024/anchors"
+}
+
+PAGES = load_corpus(CORPUS_DIR)
+
+
+def _page_url(name: str) -> str:
+    return PAGE_URLS.get(name, f"https://example.ru/{name}")
+
+
+def _extract(backend: str, name: str) -> dict:
+    extracted = get_parser_backend(backend).extract(PAGES[name], _page_url(name))
+    return {field: extracted[field] for field in SNAPSHOT_FIELDS}
+
+
+def _expected(name: str, backend: str) -> dict:
+    page = _load_expected()[name]
+    return {**{field: page[field] for field in SNAPSHOT_FIELDS}, **page.get("backends", {}).get(backend, {})}
+
+
+def _load_expected() -> dict:
+    with open(EXPECTED_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _require(backend: str) -> None:
+    if backend not in available_backends():
+        pytest.skip(f"бэкенд {backend} не установлен")
+
+
+def test_corpus_is_decoded_by_declared_charset():
+    assert "Газобетон или кирпич" in PAGES["cp1251.html"]
+
+
+@pytest.mark.parametrize("backend", list(PARSER_BACKENDS))
+@pytest.mark.parametrize("name", sorted(PAGES))
+def test_extraction_matches_snapshot(name, backend):
+    _require(backend)
+    assert _extract(backend, name) == _expected(name, backend)
+
+
+@pytest.mark.parametrize("name", sorted(name for name in PAGES if not name.startswith("malformed_")))
+def test_backends_agree_on_well_formed_pages(name):
+    reference = _extract(REFERENCE_BACKEND, name)
+    for backend in available_backends():
+        assert _extract(backend, name) == reference, backend
+
+
+def test_structured_data_takes_article_of_this_page():
+    extracted = _extract(REFERENCE_BACKEND, "json_ld.html")
+    assert extracted["extraction_path"] == "structured_data"
+    assert extracted["content"].startswith("Уральский метизный завод")
+
+
+def _update_expected() -> None:
+    """Пересобрать эталон по текущему алгоритму (нужны все бэкенды, чтобы сохранить их отличия)"""
+    missing = set(PARSER_BACKENDS) - set(available_backends())
+    if missing:
+        sys.exit(f"Для пересборки эталона нужны все бэкенды, не установлены: {', '.join(sorted(missing))}")
+
+    expected = {}
+    for name in sorted(PAGES):
+        reference = _extract(REFERENCE_BACKEND, name)
+        page = dict(reference)
+        for backend in PARSER_BACKENDS:
+            extracted = _extract(backend, name)
+            differences = {field: value for field, value in extracted.items() if value != reference[field]}
+            if differences:
+                page.setdefault("backends", {})[backend] = differences
+        expected[name] = page
+
+    with open(EXPECTED_PATH, "w", encoding="utf-8") as f:
+        json.dump(expected, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    print(f"📝 Эталон обновлён: {EXPECTED_PATH}")
+
+
+if __name__ == "__main__":
+    if "--update" in sys.argv:
+        _update_expected()
@@ -1,6 +1,7 @@
-import requests
+import httpx
 import json
 import time
+import asyncio
 from typing import Dict, Optional, Any
 import logging
 
@@ -14,12 +15,23 @@ class TextRuService:
     Проверка уникальности, SEO-анализа и правописания текстов
     """
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, client: Optional[httpx.AsyncClient] = None):
         self.api_key = api_key
         self.base_url = "https://api.text.ru/post"
         self.account_url = "https://api.text.ru/account"
+        # Общий пул соединений приложения (если не передан — временный клиент на запрос)
+        self.client = client
+        self.timeout = httpx.Timeout(30.0)
     
-    def add_text_for_check(self, text: str) -> Optional[str]:
+    async def _post(self, url: str, payload: Dict[str, Any]) -> httpx.Response:
+        """POST-запрос к API text.ru"""
+        if self.client is not None:
+            return await self.client.post(url, data=payload, timeout=self.timeout)
+        
+        async with httpx.AsyncClient() as client:
+            return await client.post(url, data=payload, timeout=self.timeout)
+    
+    async def add_text_for_check(self, text: str) -> Optional[str]:
         """
         Добавляет текст на проверку уникальности
         
@@ -39,11 +51,7 @@ class TextRuService:
             
             logger.info(f"Отправляем текст на проверку: {len(text)} символов")
             
-            response = requests.post(
-                self.base_url,
-                data=payload,
-                timeout=30
-            )
+            response = await self._post(self.base_url, payload)
             
             if response.status_code == 200:
                 result = response.json()
@@ -62,7 +70,7 @@ class TextRuService:
             logger.error(f"Ошибка при добавлении текста: {str(e)}")
             return None
 
-    def add_text_for_seo_check(self, text: str) -> Dict[str, Any]:
+    async def add_text_for_seo_check(self, text: str) -> Dict[str, Any]:
         """
         Добавляет текст на проверку уникальности (включая SEO-анализ)
         
@@ -81,11 +89,7 @@ class TextRuService:
             
             logger.info(f"Отправляем текст на проверку: {len(text)} символов")
             
-            response = requests.post(
-                self.base_url,
-                data=payload,
-                timeout=30
-            )
+            response = await self._post(self.base_url, payload)
             
             logger.info(f"Текст успешно добавлен на проверку")
             
@@ -129,7 +133,7 @@ class TextRuService:
                 'error_desc': f'Ошибка сервера: {str(e)}'
             }
     
-    def get_check_results(self, uid: str) -> Dict[str, Any]:
+    async def get_check_results(self, uid: str) -> Dict[str, Any]:
         """
         Получает результаты проверки текста по UID
         
@@ -145,11 +149,7 @@ class TextRuService:
                 'uid': uid
             }
             
-            response = requests.post(
-                self.base_url,
-                data=payload,
-                timeout=30
-            )
+            response = await self._post(self.base_url, payload)
             
             if response.status_code == 200:
                 result = response.json()
@@ -202,7 +202,7 @@ class TextRuService:
                 'ready': False
             }
 
-    def get_seo_check_results(self, uid: str) -> Dict[str, Any]:
+    async def get_seo_check_results(self, uid: str) -> Dict[str, Any]:
         """
         Получает результаты проверки текста по UID (включая SEO-анализ)
         
@@ -219,11 +219,7 @@ class TextRuService:
                 'jsonvisible': 'detail'  # Получаем детальную информацию включая SEO
             }
             
-            response = requests.post(
-                self.base_url,
-                data=payload,
-                timeout=30
-            )
+            response = await self._post(self.base_url, payload)
             
             if response.status_code == 200:
                 result = response.json()
@@ -310,7 +306,7 @@ class TextRuService:
                 'ready': False
             }
     
-    def wait_for_results(self, uid: str, max_wait: int = 120, check_interval: int = 5) -> Dict[str, Any]:
+    async def wait_for_results(self, uid: str, max_wait: int = 120, check_interval: int = 5) -> Dict[str, Any]:
         """
         Ожидает готовности результатов проверки с таймаутом
         
@@ -325,7 +321,7 @@ class TextRuService:
         start_time = time.time()
         
         while time.time() - start_time < max_wait:
-            result = self.get_check_results(uid)
+            result = await self.get_check_results(uid)
             
             if result['ready']:
                 return result
@@ -333,7 +329,7 @@ class TextRuService:
                 return result
             
             logger.info(f"Ожидание результатов... ({int(time.time() - start_time)}с)")
-            time.sleep(check_interval)
+            await asyncio.sleep(check_interval)
         
         logger.warning(f"Превышено время ожидания результатов для UID {uid}")
         return {
@@ -344,7 +340,7 @@ class TextRuService:
             'uid': uid
         }
     
-    def get_balance(self) -> int:
+    async def get_balance(self) -> int:
         """
         Получает остаток символов на балансе
         
@@ -357,11 +353,7 @@ class TextRuService:
                 'method': 'get_packages_info'
             }
             
-            response = requests.post(
-                self.account_url,
-                data=payload,
-                timeout=30
-            )
+            response = await self._post(self.account_url, payload)
             
             if response.status_code == 200:
                 result = response.json()
@@ -379,7 +371,7 @@ class TextRuService:
             logger.error(f"Ошибка при получении баланса: {str(e)}")
             return 0
     
-    def check_text_quality(self, text: str, max_wait_time: int = 120) -> Dict[str, Any]:
+    async def check_text_quality(self, text: str, max_wait_time: int = 120) -> Dict[str, Any]:
         """
         Полная проверка SEO-качества текста (водность, заспамленность, ключевые слова)
         
@@ -392,7 +384,7 @@ class TextRuService:
         """
         try:
             # Добавляем текст на SEO-проверку
-            add_result = self.add_text_for_seo_check(text)
+            add_result = await self.add_text_for_seo_check(text)
             
             if add_result['status'] != 'success':
                 return add_result
@@ -403,7 +395,7 @@ class TextRuService:
             # Ждем результатов
             start_time = time.time()
             while time.time() - start_time < max_wait_time:
-                results = self.get_seo_check_results(uid)
+                results = await self.get_seo_check_results(uid)
                 
                 if results['status'] == 'success' and results['ready']:
                     logger.info(f"SEO-результаты готовы для UID {uid}")
@@ -414,11 +406,11 @@ class TextRuService:
                 elif results['status'] == 'pending':
                     logger.info(f"SEO-результаты еще не готовы для UID {uid}, продолжаем ждать...")
                     # Ждем 5 секунд перед следующей проверкой
-                    time.sleep(5)
+                    await asyncio.sleep(5)
                     continue
                 else:
                     logger.warning(f"Неожиданный статус результатов для UID {uid}: {results['status']}")
-                    time.sleep(5)
+                    await asyncio.sleep(5)
                     continue
             
             # Превышено время ожидания
@@ -2,82 +2,204 @@
 Сервис для аутентификации с Yandex Cloud API
 """
 
+import os
 import json
 import time
+import asyncio
 import jwt
-import requests
+import httpx
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.backends import default_backend
 from typing import Optional
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Нет fcntl (Windows) — общий файл токена между воркерами недоступен
+
+
+IAM_TOKENS_URL = "https://iam.api.cloud.yandex.net/iam/v1/tokens"
+
 
 class YandexAuthService:
-    def __init__(self, key_file_path: str = "authorized_key_yandex.json"):
+    def __init__(self, key_file_path: str = "authorized_key_yandex.json",
+                 token_file_path: Optional[str] = None,
+                 token_lifetime: float = 11 * 60 * 60,
+                 refresh_margin: float = 60 * 60,
+                 client: Optional[httpx.AsyncClient] = None):
+        """
+        Инициализация сервиса
+
+        Args:
+            key_file_path: Путь к авторизованному ключу сервисного аккаунта
+            token_file_path: Файл для общего IAM токена всех воркеров узла (None — без файла)
+            token_lifetime: Сколько считаем токен действующим (IAM токен живёт 12 часов)
+            refresh_margin: За сколько секунд до истечения токен обновляется заранее
+            client: Общий пул соединений к IAM (задаётся при старте приложения)
+        """
         self.key_file_path = key_file_path
+        self.token_file_path = token_file_path if fcntl else None
+        self.token_lifetime = token_lifetime
+        self.refresh_margin = refresh_margin
+        self.client = client
         self._iam_token = None
         self._token_expires_at = 0
-        
+        self._key_data = None
+        self._refresh_lock = asyncio.Lock()
+        self._refresh_task = None
+
     def _load_key_data(self):
-        """Загрузить данные ключа из JSON файла"""
-        with open(self.key_file_path, 'r') as f:
-            return json.load(f)
-    
+        """Загрузить данные ключа из JSON файла (один раз на процесс)"""
+        if self._key_data is None:
+            with open(self.key_file_path, 'r') as f:
+                self._key_data = json.load(f)
+        return self._key_data
+
     def _generate_jwt(self) -> str:
         """Генерировать JWT токен для получения IAM токена"""
         key_data = self._load_key_data()
-        
+
         service_account_id = key_data["service_account_id"]
         key_id = key_data["id"]
         private_key = key_data["private_key"]
-        
+
         # Формирование JWT
         now = int(time.time())
         payload = {
-            "aud": "https://iam.api.cloud.yandex.net/iam/v1/tokens",
+            "aud": IAM_TOKENS_URL,
             "iss": service_account_id,
             "iat": now,
             "exp": now + 360  # JWT живёт 6 минут
         }
-        
+
         encoded_jwt = jwt.encode(
             payload,
             private_key,
             algorithm="PS256",
             headers={"kid": key_id}
         )
-        
+
         return encoded_jwt
-    
-    def _fetch_iam_token(self) -> str:
+
+    async def _fetch_iam_token(self) -> str:
         """Получить IAM токен от Yandex Cloud"""
-        jwt_token = self._generate_jwt()
-        
+        jwt_token = await asyncio.to_thread(self._generate_jwt)
+
         headers = {
             "Content-Type": "application/json"
         }
         data = {
             "jwt": jwt_token
         }
-        
-        response = requests.post(
-            "https://iam.api.cloud.yandex.net/iam/v1/tokens", 
-            headers=headers, 
-            json=data
-        )
-        
+
+        if self.client is not None:
+            response = await self.client.post(IAM_TOKENS_URL, headers=headers, json=data)
+        else:
+            async with httpx.AsyncClient(timeout=httpx.Timeout(10.0)) as client:
+                response = await client.post(IAM_TOKENS_URL, headers=headers, json=data)
+
         if response.status_code == 200:
             return response.json()["iamToken"]
         else:
             raise Exception(f"Ошибка получения IAM-токена: {response.status_code} - {response.text}")
-    
-    def get_iam_token(self) -> str:
+
+    def _token_is_fresh(self, expires_at: float) -> bool:
+        """Токен действует дольше, чем запас на упреждающее обновление"""
+        return time.time() < expires_at - self.refresh_margin
+
+    def _read_shared_token(self) -> Optional[dict]:
+        """Прочитать общий токен воркеров из файла"""
+        try:
+            with open(self.token_file_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_shared_token(self, token: str, expires_at: float) -> None:
+        """Атомарно записать общий токен в файл"""
+        tmp_path = f"{self.token_file_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"iam_token": token, "expires_at": expires_at}, f)
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, self.token_file_path)
+
+    async def _refresh_shared_token(self) -> None:
+        """Обновить токен под файловой блокировкой, переиспользуя токен соседних воркеров"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.token_file_path)), exist_ok=True)
+
+        with open(f"{self.token_file_path}.lock", 'w') as lock_file:
+            await asyncio.to_thread(fcntl.flock, lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                shared = self._read_shared_token()
+                if shared and self._token_is_fresh(shared["expires_at"]):
+                    self._iam_token = shared["iam_token"]
+                    self._token_expires_at = shared["expires_at"]
+                    return
+
+                token = await self._fetch_iam_token()
+                expires_at = time.time() + self.token_lifetime
+                self._write_shared_token(token, expires_at)
+                self._iam_token = token
+                self._token_expires_at = expires_at
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    async def refresh_iam_token(self, force: bool = False) -> str:
+        """Обновить IAM токен (одновременные вызовы ждут одно общее обновление)"""
+        async with self._refresh_lock:
+            if not force and self._iam_token and self._token_is_fresh(self._token_expires_at):
+                return self._iam_token
+
+            if self.token_file_path:
+                await self._refresh_shared_token()
+            else:
+                self._iam_token = await self._fetch_iam_token()
+                self._token_expires_at = time.time() + self.token_lifetime
+
+            print("🔑 IAM токен обновлён")
+            return self._iam_token
+
+    async def get_iam_token(self) -> str:
         """Получить действующий IAM токен (с кешированием)"""
-        now = time.time()
-        
-        # Если токен истёк или вот-вот истечёт, обновляем
-        if not self._iam_token or now >= self._token_expires_at - 60:
-            self._iam_token = self._fetch_iam_token()
-            # IAM токен живёт 12 часов, ставим на 11 часов для безопасности
-            self._token_expires_at = now + (11 * 60 * 60)
-            
-        return self._iam_token
\ No newline at end of file
+        if self._iam_token and self._token_is_fresh(self._token_expires_at):
+            return self._iam_token
+
+        return await self.refresh_iam_token()
+
+    async def _background_refresh(self) -> None:
+        """Фоновое обновление токена до истечения срока действия"""
+        while True:
+            try:
+                await self.refresh_iam_token()
+                delay = max(self._token_expires_at - self.refresh_margin - time.time(), 60)
+            except Exception as e:
+                print(f"❌ Ошибка фонового обновления IAM токена: {str(e)}")
+                delay = 60
+            await asyncio.sleep(delay)
+
+    def start_background_refresh(self) -> None:
+        """Запустить фоновое обновление токена (вызывается при старте приложения)"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._background_refresh())
+
+    async def stop_background_refresh(self) -> None:
+        """Остановить фоновое обновление токена"""
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+
+_auth_service = None
+
+
+def get_auth_service() -> YandexAuthService:
+    """Общий для процесса провайдер IAM токена"""
+    global _auth_service
+    if _auth_service is None:
+        token_file_path = os.getenv("YANDEX_IAM_TOKEN_FILE")
+        _auth_service = YandexAuthService(token_file_path=token_file_path)
+    return _auth_service